@@ -1,4 +1,4 @@
-from .provider import get_ai_provider, AIProvider
+from .provider import get_ai_provider, AIProvider, AsyncAIProvider
 
 
-__all__ = ['get_ai_provider', "AIProvider"]
\ No newline at end of file
+__all__ = ['get_ai_provider', "AIProvider", "AsyncAIProvider"]
\ No newline at end of file
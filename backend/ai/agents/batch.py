@@ -0,0 +1,38 @@
+# backend/ai/agents/batch.py
+from __future__ import annotations
+import asyncio
+from typing import Any, Callable, List, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+async def run_batch_async(
+    fn: Callable[..., T],
+    items: Sequence[Tuple[Any, ...]],
+    max_concurrency: int = 4,
+    return_exceptions: bool = False,
+) -> List[Any]:
+    """
+    Call fn(*item) for every item on worker threads, at most max_concurrency at a time.
+    Results keep the order of items. With return_exceptions=True a failing item's
+    exception takes its slot instead of aborting the whole batch.
+    """
+    sem = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def one(args: Tuple[Any, ...]) -> T:
+        async with sem:
+            return await asyncio.to_thread(fn, *args)
+
+    return list(await asyncio.gather(*(one(a) for a in items), return_exceptions=return_exceptions))
+
+
+def run_batch(
+    fn: Callable[..., T],
+    items: Sequence[Tuple[Any, ...]],
+    max_concurrency: int = 4,
+    return_exceptions: bool = False,
+) -> List[Any]:
+    """
+    Sync wrapper around run_batch_async (must not be called from a running event loop).
+    """
+    return asyncio.run(run_batch_async(fn, items, max_concurrency, return_exceptions))
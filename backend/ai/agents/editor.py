@@ -1,19 +1,27 @@
 # backend/ai/agents/editor.py
 from __future__ import annotations
 from pathlib import Path
-from typing import Dict, Any
+from typing import List, Tuple
 from ..provider import AIProvider
+from .batch import run_batch
+from .template import PromptObj, load_template, render_template, to_prompt_text
 
 class EditorAgent:
     def __init__(self, provider: AIProvider, templates_dir: Path) -> None:
         self.provider = provider
         self.tpl_path = templates_dir / "editor.md"
 
-    def review(self, spec: Dict[str, Any], chapter: Dict[str, Any], draft: str) -> str:
-        tpl = self.tpl_path.read_text(encoding="utf-8")
-        prompt = tpl.replace("{{SPEC}}", str(spec)).replace("{{OUTLINE}}", str(chapter)).replace("{{DRAFT}}", draft)
+    def review(self, spec: PromptObj, chapter: PromptObj, draft: str) -> str:
+        tpl = load_template(self.tpl_path)
+        prompt = render_template(tpl, SPEC=to_prompt_text(spec), OUTLINE=to_prompt_text(chapter), DRAFT=draft)
         messages = [
             {"role": "system", "content": "You are a strict fiction editor."},
             {"role": "user", "content": prompt},
         ]
         return self.provider.chat(messages, temperature=0.3, max_tokens=1200)
+
+    def review_many(self, items: List[Tuple[PromptObj, PromptObj, str]], max_concurrency: int = 4) -> List[str]:
+        """
+        Review several drafts concurrently; items are (spec, chapter, draft).
+        """
+        return run_batch(self.review, items, max_concurrency=max_concurrency)
@@ -1,25 +1,58 @@
 # backend/ai/agents/guard.py
 from __future__ import annotations
+import re
 from pathlib import Path
-from typing import Dict, Any
+from typing import Tuple
 from ..provider import AIProvider
+from .template import PromptObj, load_template, render_template, to_prompt_text
 
 REQUIRED_MARKERS = ["# ", "## 摘要", "## 正文", "## 结尾钩子", "## 角色状态"]
 
+# "摘要" / "##摘要" / "### 摘要：" / "**摘要**" / "【摘要】" on a line of its own -> "## 摘要"
+_SECTION_RES = [
+    (m, re.compile(rf"^[ \t]*(?:#{{1,6}}[ \t]*|\*\*|【)?[ \t]*{re.escape(m[3:])}[ \t]*(?:\*\*|】)?[ \t]*[:：]?[ \t]*$", re.M))
+    for m in REQUIRED_MARKERS
+    if m.startswith("## ")
+]
+
+
+def _missing(draft: str) -> list:
+    return [m for m in REQUIRED_MARKERS if m not in draft]
+
+
 class GuardAgent:
     def __init__(self, provider: AIProvider, templates_dir: Path) -> None:
         self.provider = provider
         self.tpl_path = templates_dir / "guard.md"
 
-    def check(self, spec: Dict[str, Any], draft: str) -> str:
-        missing = [m for m in REQUIRED_MARKERS if m not in draft]
+    @staticmethod
+    def repair(draft: str) -> str:
+        """
+        Rule-based fix for section headers the model wrote in a slightly different form.
+        """
+        for marker, pat in _SECTION_RES:
+            if marker not in draft:
+                draft = pat.sub(marker, draft, count=1)
+        return draft
+
+    def check(self, spec: PromptObj, draft: str) -> str:
+        missing = _missing(draft)
         if not missing:
             return "PASS"
 
-        tpl = self.tpl_path.read_text(encoding="utf-8")
-        prompt = tpl.replace("{{SPEC}}", str(spec)).replace("{{DRAFT}}", draft).replace("{{MISSING}}", str(missing))
+        tpl = load_template(self.tpl_path)
+        prompt = render_template(tpl, SPEC=to_prompt_text(spec), DRAFT=draft, MISSING=str(missing))
         messages = [
             {"role": "system", "content": "You are a safety & formatting checker."},
             {"role": "user", "content": prompt},
         ]
         return self.provider.chat(messages, temperature=0.2, max_tokens=900)
+
+    def check_and_repair(self, spec: PromptObj, draft: str) -> Tuple[str, str]:
+        """
+        Like check(), but tries repair() first; the LLM is only asked when
+        structural issues remain. Returns (verdict, draft).
+        """
+        if _missing(draft):
+            draft = self.repair(draft)
+        return self.check(spec, draft), draft
@@ -0,0 +1,61 @@
+# backend/ai/agents/pipeline.py
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+from ..provider import AIProvider
+from .batch import run_batch
+from .editor import EditorAgent
+from .guard import GuardAgent
+from .prompt_builder import PromptBuilderAgent
+from .template import to_prompt_text
+from .writer import WriterAgent
+
+
+class ChapterPipeline:
+    """
+    PromptBuilder -> Writer -> (Guard || Editor) for one chapter.
+
+    The providers only expose single chat calls, so the chain runs client-side;
+    Guard and Editor both depend only on the draft, so they are issued together
+    instead of back to back.
+    """
+
+    def __init__(
+        self,
+        provider: AIProvider,
+        templates_dir: Path,
+        style_bible_path: Optional[Path] = None,
+    ) -> None:
+        self.builder = PromptBuilderAgent(provider, templates_dir, style_bible_path=style_bible_path)
+        self.writer = WriterAgent(provider, templates_dir)
+        self.guard = GuardAgent(provider, templates_dir)
+        self.editor = EditorAgent(provider, templates_dir)
+
+    def run(
+        self,
+        spec: Dict[str, Any],
+        chapter: Dict[str, Any],
+        knowledge: str = "",
+        memory: str = "",
+    ) -> Dict[str, str]:
+        # serialize once; every agent below reuses the same text
+        spec_text = to_prompt_text(spec)
+        chapter_text = to_prompt_text(chapter)
+        prompt = self.builder.build(spec_text, chapter, knowledge=knowledge, memory=memory)
+        draft = self.writer.write(spec_text, chapter_text, prompt)
+        with ThreadPoolExecutor(max_workers=2) as ex:
+            guard_f = ex.submit(self.guard.check_and_repair, spec_text, draft)
+            review_f = ex.submit(self.editor.review, spec_text, chapter_text, draft)
+            (guard, draft), review = guard_f.result(), review_f.result()
+        return {"prompt": prompt, "draft": draft, "guard": guard, "review": review}
+
+    def run_many(
+        self,
+        items: List[Tuple[Dict[str, Any], Dict[str, Any], str, str]],
+        max_concurrency: int = 4,
+    ) -> List[Dict[str, str]]:
+        """
+        Run independent chapters concurrently; items are (spec, chapter, knowledge, memory).
+        """
+        return run_batch(self.run, items, max_concurrency=max_concurrency)
@@ -2,7 +2,29 @@ from __future__ import annotations
 
 import json
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+from .template import load_template
+
+
+class _LazyFormat(dict):
+    """
+    Mapping for str.format_map: each value is computed on first lookup,
+    so placeholders the template doesn't use are never built.
+    """
+
+    def __init__(self, loaders: Dict[str, Callable[[], str]]):
+        super().__init__()
+        self._loaders = loaders
+
+    def __missing__(self, key: str) -> str:
+        v = self[key] = self._loaders[key]()
+        return v
 
 
 class PromptBuilderAgent:
@@ -53,22 +75,35 @@ class PromptBuilderAgent:
             self.style_bible_path = Path("data") / "knowledge" / "style_bible.json"
         else:
             self.style_bible_path = Path(style_bible_path)
+        # (mtime, compact json) of the last style bible parse
+        self._style_bible_cache: Optional[Tuple[float, str]] = None
 
     def _read_text(self, p: Path) -> str:
         if p.is_dir():
             raise IsADirectoryError(f"Template path is a directory, expected file: {p}")
-        return p.read_text(encoding="utf-8")
+        return load_template(p)
 
     def _load_style_bible_text(self) -> str:
         """
-        Return pretty JSON string (or fallback text).
+        Return compact JSON string (or fallback text); no indentation, to save prompt tokens.
+        Re-parsed only when the file's mtime changes.
         """
         if not self.style_bible_path.exists():
             return "(style_bible.json not found; follow default style guidance in template)"
 
-        s = self.style_bible_path.read_text(encoding="utf-8", errors="strict").strip()
-        obj = json.loads(s)  # ensure valid JSON
-        return json.dumps(obj, ensure_ascii=False, indent=2)
+        mtime = self.style_bible_path.stat().st_mtime
+        if self._style_bible_cache is not None and self._style_bible_cache[0] == mtime:
+            return self._style_bible_cache[1]
+
+        if orjson is not None:
+            obj = orjson.loads(self.style_bible_path.read_bytes())  # ensure valid JSON
+            text = orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        else:
+            s = self.style_bible_path.read_text(encoding="utf-8", errors="strict").strip()
+            obj = json.loads(s)  # ensure valid JSON
+            text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+        self._style_bible_cache = (mtime, text)
+        return text
 
     @staticmethod
     def _chapter_outline(chapter: Dict[str, Any]) -> str:
@@ -125,24 +160,19 @@ class PromptBuilderAgent:
             )
         tpl = self._read_text(self.tpl_path)
 
-        # 2) load style bible
-        style_bible = self._load_style_bible_text()
-
-        # 3) build outline text
-        chapter_outline = self._chapter_outline(chapter)
-
-        # 4) format
+        # 2) format
         # template can reference these placeholders:
         # {style_bible} {spec} {chapter_outline} {memory} {knowledge}
-        prompt = tpl.format(
-            style_bible=style_bible,
-            spec=spec or "",
-            chapter_outline=chapter_outline or "",
-            memory=memory or "(none)",
-            knowledge=knowledge or "",
-        )
-
-        # 5) optional refine by LLM (default off; more stable if off)
+        # style bible / outline text are only built if the template uses them
+        prompt = tpl.format_map(_LazyFormat({
+            "style_bible": self._load_style_bible_text,
+            "spec": lambda: spec or "",
+            "chapter_outline": lambda: self._chapter_outline(chapter) or "",
+            "memory": lambda: memory or "(none)",
+            "knowledge": lambda: knowledge or "",
+        }))
+
+        # 3) optional refine by LLM (default off; more stable if off)
         if not self.use_llm_refine:
             return prompt
 
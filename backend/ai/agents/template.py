@@ -0,0 +1,53 @@
+# backend/ai/agents/template.py
+from __future__ import annotations
+import functools
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, Tuple, Union
+
+_PH = re.compile(r"\{\{(\w+)\}\}")
+
+PromptObj = Union[str, Dict[str, Any]]  # pre-serialized text or raw dict
+
+
+@functools.lru_cache(maxsize=64)
+def _read_template(path: str, mtime: float) -> str:
+    return Path(path).read_text(encoding="utf-8")
+
+
+def load_template(p: Path) -> str:
+    """
+    Read a prompt template; cached in memory until the file's mtime changes.
+    """
+    return _read_template(str(p), p.stat().st_mtime)
+
+
+@functools.lru_cache(maxsize=64)
+def _parse_template(tpl: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    # split() with one group alternates literal, name, literal, ..., literal
+    parts = _PH.split(tpl)
+    return tuple(parts[0::2]), tuple(parts[1::2])
+
+
+def render_template(tpl: str, **values: str) -> str:
+    """
+    Fill {{NAME}} placeholders; unknown names are left as-is.
+    The template is split into literal/slot chunks once, so a render is a single join.
+    """
+    literals, names = _parse_template(tpl)
+    out = [literals[0]]
+    for name, lit in zip(names, literals[1:]):
+        out.append(values.get(name, "{{" + name + "}}"))
+        out.append(lit)
+    return "".join(out)
+
+
+def to_prompt_text(obj: PromptObj) -> str:
+    """
+    Serialize spec/chapter objects for a prompt (JSON, CJK kept as-is).
+    Strings pass through, so callers can serialize once and reuse the result.
+    """
+    if isinstance(obj, str):
+        return obj
+    return json.dumps(obj, ensure_ascii=False, default=str)
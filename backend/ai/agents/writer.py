@@ -1,19 +1,45 @@
 # backend/ai/agents/writer.py
 from __future__ import annotations
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, List, Tuple
 from ..provider import AIProvider
+from .batch import run_batch
+from .template import PromptObj, load_template, render_template, to_prompt_text
 
 class WriterAgent:
     def __init__(self, provider: AIProvider, templates_dir: Path) -> None:
         self.provider = provider
         self.tpl_path = templates_dir / "writer.md"
 
-    def write(self, spec: Dict[str, Any], chapter: Dict[str, Any], writing_prompt: str) -> str:
-        tpl = self.tpl_path.read_text(encoding="utf-8")
-        prompt = tpl.replace("{{SPEC}}", str(spec)).replace("{{OUTLINE}}", str(chapter)).replace("{{PROMPT}}", writing_prompt)
-        messages = [
+    def _messages(self, spec: PromptObj, chapter: PromptObj, writing_prompt: str) -> List[Dict[str, Any]]:
+        tpl = load_template(self.tpl_path)
+        if "{{PROMPT}}" in tpl:
+            prompt = render_template(tpl, SPEC=to_prompt_text(spec), OUTLINE=to_prompt_text(chapter), PROMPT=writing_prompt)
+        else:
+            # writer.md uses {style_bible}/{spec}/... slots and the caller already rendered it
+            # (run_chapter / PromptBuilderAgent); re-rendering would send the empty template
+            prompt = writing_prompt
+        return [
             {"role": "system", "content": "You are a bestselling novelist. Output strictly in required format."},
             {"role": "user", "content": prompt},
         ]
-        return self.provider.chat(messages, temperature=0.8, max_tokens=3500)
+
+    def write(self, spec: PromptObj, chapter: PromptObj, writing_prompt: str, temperature: float = 0.8) -> str:
+        return self.provider.chat(self._messages(spec, chapter, writing_prompt), temperature=temperature, max_tokens=3500)
+
+    def write_stream(
+        self, spec: PromptObj, chapter: PromptObj, writing_prompt: str, temperature: float = 0.8
+    ) -> Iterator[str]:
+        """
+        Yield the draft as it is generated, so callers can show progress or
+        run cheap checks (e.g. GuardAgent markers) before the draft is complete.
+        """
+        yield from self.provider.chat_stream(
+            self._messages(spec, chapter, writing_prompt), temperature=temperature, max_tokens=3500
+        )
+
+    def write_many(self, items: List[Tuple[PromptObj, PromptObj, str]], max_concurrency: int = 4) -> List[str]:
+        """
+        Write several chapters concurrently; items are (spec, chapter, writing_prompt).
+        """
+        return run_batch(self.write, items, max_concurrency=max_concurrency)
@@ -1,19 +1,39 @@
 from __future__ import annotations
 
+import functools
 import os
+from dataclasses import dataclass
 from pathlib import Path
 
-# Load .env if present (backend/ai/.env or project root .env)
-try:
-    from dotenv import load_dotenv
-    here = Path(__file__).resolve().parent
-    load_dotenv(here / ".env", override=False)
-    load_dotenv(Path.cwd() / ".env", override=False)
-except Exception:
-    pass
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
+@dataclass(frozen=True)
+class Settings:
+    openai_api_key: str
+    openai_model: str
 
-if not OPENAI_API_KEY:
-    raise RuntimeError("Missing OPENAI_API_KEY env var (check your .env or shell env)")
+
+def _load_env() -> None:
+    # Load .env if present (backend/ai/.env or project root .env); each file parsed at most once
+    try:
+        from dotenv import load_dotenv
+        here = Path(__file__).resolve().parent / ".env"
+        cwd = Path.cwd().resolve() / ".env"
+        for p in (here,) if cwd == here else (here, cwd):
+            if p.is_file():
+                load_dotenv(p, override=False)
+    except Exception:
+        pass
+
+
+@functools.lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    _load_env()
+    key = os.getenv("OPENAI_API_KEY")
+    if not key:
+        raise RuntimeError("Missing OPENAI_API_KEY env var (check your .env or shell env)")
+    return Settings(openai_api_key=key, openai_model=os.getenv("OPENAI_MODEL", "gpt-4.1-mini"))
+
+
+_settings = get_settings()
+OPENAI_API_KEY = _settings.openai_api_key
+OPENAI_MODEL = _settings.openai_model
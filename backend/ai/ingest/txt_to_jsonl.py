@@ -21,102 +21,148 @@ Heuristics:
 from __future__ import annotations
 
 import argparse
+import functools
 import json
+import multiprocessing
+import os
 import re
 from pathlib import Path
-from typing import List, Tuple
+from typing import Any, Dict, List, Tuple
 
-CHAPTER_PATTERNS = [
-    re.compile(r"^\s*第\s*([0-9一二三四五六七八九十百千两]+)\s*章.*$"),
-    re.compile(r"^\s*第\s*([0-9一二三四五六七八九十百千两]+)\s*节.*$"),
-    re.compile(r"^\s*(chapter|CHAPTER)\s+(\d+)\b.*$"),
-]
+try:
+    import orjson  # optional: faster, emits utf-8 bytes directly
+except ImportError:
+    orjson = None  # type: ignore
+
+WRITE_BUF_BYTES = 1 << 20
+
+# one alternation for "第N章" / "第N节" / "Chapter N"; [^\S\n] keeps matches on a single line
+CHAPTER_RE = re.compile(
+    r"^[^\S\n]*(?:第[^\S\n]*([0-9一二三四五六七八九十百千两]+)[^\S\n]*[章节]|(?:chapter|CHAPTER)[^\S\n]+(\d+)\b).*$",
+    re.M,
+)
+
+NEWLINE_RE = re.compile(r"\r\n?")
+JUNK_WORDS = ("本书来自", "更多精彩", "请收藏")
+PARA_BREAK_RE = re.compile(r"\n\s*\n+")
+SENT_SPLIT_RE = re.compile(r"(?<=[。！？!?])\s*")
+CJK_RE = re.compile(r"[\u4e00-\u9fff]")
 
 CN_NUM = {"零":0,"一":1,"二":2,"两":2,"三":3,"四":4,"五":5,"六":6,"七":7,"八":8,"九":9,"十":10,"百":100,"千":1000}
+# digit-only numerals ("三", "一二") -> ascii digits, parsed by int() in one shot
+CN_DIGITS = str.maketrans({k: str(v) for k, v in CN_NUM.items() if v < 10})
 
+@functools.lru_cache(maxsize=4096)
 def cn_to_int(s: str) -> int:
     s = s.strip()
     if s.isdigit():
         return int(s)
-    # very small CN numeral converter (good for 1-9999)
-    total, unit, num = 0, 1, 0
-    for ch in reversed(s):
-        if ch in ("十","百","千"):
-            unit = CN_NUM[ch]
-            if num == 0:
-                num = 1
-            total += num * unit
-            num = 0
-            unit = 1
-        elif ch in CN_NUM:
-            num = CN_NUM[ch]
-        else:
+    d = s.translate(CN_DIGITS)
+    if d.isdigit():
+        return int(d)
+    # very small CN numeral converter (good for 1-9999): 二千零五 -> 2*1000 + 5, 十二 -> 1*10 + 2
+    total, num = 0, 0
+    for ch in s:
+        v = CN_NUM.get(ch)
+        if v is None:
             # unknown char -> ignore
             continue
-    total += num * unit
-    return total if total > 0 else 0
+        if v >= 10:
+            total += (num or 1) * v
+            num = 0
+        else:
+            num = v
+    total += num
+    return total
 
 def normalize_text(t: str) -> str:
-    t = t.replace("\r\n", "\n").replace("\r", "\n")
-    # drop common junk lines
-    lines = []
-    for line in t.split("\n"):
-        line = line.strip()
-        if not line:
-            lines.append("")
-            continue
-        if "本书来自" in line or "更多精彩" in line or "请收藏" in line:
-            continue
-        lines.append(line)
+    t = NEWLINE_RE.sub("\n", t)
+    lines = map(str.strip, t.split("\n"))
+    # drop common junk lines (most corpora have none: skip the per-line test)
+    if any(w in t for w in JUNK_WORDS):
+        lines = [line for line in lines if not any(w in line for w in JUNK_WORDS)]
+    t = "\n".join(lines)
     # collapse multiple blank lines
-    out = []
-    blank = 0
-    for line in lines:
-        if line == "":
-            blank += 1
-            if blank <= 1:
-                out.append("")
-        else:
-            blank = 0
-            out.append(line)
-    return "\n".join(out).strip()
+    while "\n\n\n" in t:
+        t = t.replace("\n\n\n", "\n\n")
+    return t.strip()
+
+def _chapter_num(m: re.Match) -> int:
+    if m.group(2) is not None:
+        return int(m.group(2))
+    # Chinese: first group is cn number
+    return cn_to_int(m.group(1))
 
 def detect_chapter(line: str) -> Tuple[bool, int]:
-    for pat in CHAPTER_PATTERNS:
-        m = pat.match(line)
-        if not m:
-            continue
-        if len(m.groups()) >= 2 and m.group(1).lower() == "chapter":
-            return True, int(m.group(2))
-        # Chinese: first group is cn number
-        return True, cn_to_int(m.group(1))
-    return False, 0
+    m = CHAPTER_RE.match(line)
+    if not m:
+        return False, 0
+    return True, _chapter_num(m)
+
+def split_chapters(text: str) -> List[Tuple[int, str]]:
+    """
+    Locate all chapter headers in one scan; return (chapter_num, body) pairs.
+    Text before the first header (or the whole text if there is none) is chapter 0.
+    """
+    chapters: List[Tuple[int, str]] = []
+    cur_ch = 0
+    prev_end = 0
+    for m in CHAPTER_RE.finditer(text):
+        if m.start() > prev_end or chapters:
+            chapters.append((cur_ch, text[prev_end:m.start()]))
+        ch_num = _chapter_num(m)
+        cur_ch = ch_num if ch_num > 0 else (cur_ch + 1 if cur_ch >= 0 else 1)
+        prev_end = m.end()
+    chapters.append((cur_ch, text[prev_end:]))
+    return chapters
 
 def split_paragraphs(block: str) -> List[str]:
-    # split by blank lines first
-    paras = [p.strip() for p in re.split(r"\n\s*\n+", block) if p.strip()]
+    # split by blank lines first; strip each piece once, drop empties
+    paras: List[str] = []
+    prev = 0
+    for m in PARA_BREAK_RE.finditer(block):
+        p = block[prev:m.start()].strip()
+        if p:
+            paras.append(p)
+        prev = m.end()
+    p = block[prev:].strip()
+    if p:
+        paras.append(p)
     return paras
 
 def split_by_punct(text: str, max_chars: int) -> List[str]:
     # fallback: split by sentence punctuation
-    sents = re.split(r"(?<=[。！？!?])\s*", text)
-    chunks, cur = [], ""
+    sents = SENT_SPLIT_RE.split(text)
+    chunks: List[str] = []
+    cur: List[str] = []
+    cur_len = 0  # == len(" ".join(cur))
     for s in sents:
         if not s:
             continue
-        if len(cur) + len(s) <= max_chars:
-            cur += ("" if not cur else " ") + s
+        if cur_len + len(s) <= max_chars:
+            cur_len += len(s) + (1 if cur else 0)
+            cur.append(s)
         else:
             if cur:
-                chunks.append(cur.strip())
-            cur = s
+                chunks.append(" ".join(cur).strip())
+            cur, cur_len = [s], len(s)
     if cur:
-        chunks.append(cur.strip())
+        chunks.append(" ".join(cur).strip())
     return chunks
 
 def pack_paras(paras: List[str], min_chars: int, max_chars: int) -> List[str]:
-    out = []
-    buf = ""
+    # paras are expected to be stripped (split_paragraphs / split_by_punct output)
+    out: List[str] = []
+    buf: List[str] = []
+    buf_len = 0  # == len(" ".join(buf))
+
+    def flush() -> None:
+        merged = " ".join(buf).strip()
+        if len(merged) < min_chars and out:
+            out[-1] = (out[-1] + " " + merged).strip()
+        else:
+            out.append(merged)
+
     for p in paras:
         if not p:
             continue
@@ -131,46 +177,30 @@ def pack_paras(paras: List[str], min_chars: int, max_chars: int) -> List[str]:
             continue
 
         if not buf:
-            buf = p
-        elif len(buf) + 1 + len(p) <= max_chars:
-            buf = (buf + " " + p).strip()
+            buf, buf_len = [p], len(p)
+        elif buf_len + 1 + len(p) <= max_chars:
+            buf.append(p)
+            buf_len += 1 + len(p)
         else:
-            if len(buf) < min_chars and out:
-                out[-1] = (out[-1] + " " + buf).strip()
-            else:
-                out.append(buf.strip())
-            buf = p
+            flush()
+            buf, buf_len = [p], len(p)
 
     if buf:
-        if len(buf) < min_chars and out:
-            out[-1] = (out[-1] + " " + buf).strip()
-        else:
-            out.append(buf.strip())
+        flush()
     return out
 
+def _jsonl_line(rec: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(rec, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(rec, ensure_ascii=False) + "\n").encode("utf-8")
+
 def convert_file(in_path: Path, out_path: Path, min_chars: int, max_chars: int) -> int:
-    raw = in_path.read_text(encoding="utf-8", errors="ignore")
+    # one read + decode; normalize_text handles \r, so skip text-mode newline translation
+    raw = in_path.read_bytes().decode("utf-8", errors="ignore")
     text = normalize_text(raw)
 
     # parse chapters by headers
-    lines = text.split("\n")
-    chapters: List[Tuple[int, List[str]]] = []
-    cur_ch = 0
-    cur_lines: List[str] = []
-
-    for line in lines:
-        is_ch, ch_num = detect_chapter(line)
-        if is_ch:
-            # flush previous
-            if cur_lines:
-                chapters.append((cur_ch, cur_lines))
-            cur_ch = ch_num if ch_num > 0 else (cur_ch + 1 if cur_ch >= 0 else 1)
-            cur_lines = []
-            continue
-        cur_lines.append(line)
-
-    if cur_lines:
-        chapters.append((cur_ch, cur_lines))
+    chapters = split_chapters(text)
 
     # if no chapter header detected, treat as chapter 1
     if len(chapters) == 1 and chapters[0][0] == 0:
@@ -180,9 +210,10 @@ def convert_file(in_path: Path, out_path: Path, min_chars: int, max_chars: int)
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
     n = 0
-    with out_path.open("w", encoding="utf-8") as f:
-        for ch_num, ch_lines in chapters:
-            block = "\n".join(ch_lines).strip()
+    buf = bytearray()
+    with out_path.open("wb") as f:
+        for ch_num, body in chapters:
+            block = body.strip()
             if not block:
                 continue
             paras = split_paragraphs(block)
@@ -199,11 +230,15 @@ def convert_file(in_path: Path, out_path: Path, min_chars: int, max_chars: int)
                     "text": p,
                     "meta": {
                         "source_file": in_path.name,
-                        "lang": "zh" if re.search(r"[\u4e00-\u9fff]", p) else "en",
+                        "lang": "zh" if CJK_RE.search(p) else "en",
                     },
                 }
-                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                buf += _jsonl_line(rec)
                 n += 1
+                if len(buf) >= WRITE_BUF_BYTES:
+                    f.write(buf)
+                    buf.clear()
+        f.write(buf)
     return n
 
 def main():
@@ -212,6 +247,7 @@ def main():
     ap.add_argument("--out_dir", default="data/corpora/jsonl", help="output folder for .jsonl")
     ap.add_argument("--min_chars", type=int, default=200, help="min chars per paragraph chunk")
     ap.add_argument("--max_chars", type=int, default=900, help="max chars per paragraph chunk")
+    ap.add_argument("--workers", type=int, default=0, help="parallel processes (0=cpu count, 1=serial)")
     args = ap.parse_args()
 
     in_dir = Path(args.in_dir)
@@ -222,10 +258,17 @@ def main():
     if not txts:
         raise SystemExit(f"No .txt files found in: {in_dir}")
 
+    jobs = [(p, out_dir / f"{p.stem}.jsonl", args.min_chars, args.max_chars) for p in txts]
+    workers = min(args.workers or os.cpu_count() or 1, len(jobs))
+    if workers > 1:
+        # one novel per process: regex + json work is CPU-bound
+        with multiprocessing.Pool(processes=workers) as pool:
+            counts = pool.starmap(convert_file, jobs)
+    else:
+        counts = [convert_file(*job) for job in jobs]
+
     total = 0
-    for p in txts:
-        out_path = out_dir / f"{p.stem}.jsonl"
-        n = convert_file(p, out_path, args.min_chars, args.max_chars)
+    for (p, out_path, _, _), n in zip(jobs, counts):
         print(f"[OK] {p.name} -> {out_path} ({n} lines)")
         total += n
     print(f"[DONE] total lines: {total}")
@@ -0,0 +1,371 @@
+# -*- coding: utf-8 -*-
+"""
+Shared helpers for the knowledge extraction scripts: corpus JSONL loading,
+excerpt sampling, and LLM YAML post-processing / parsing.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import yaml
+
+try:
+    import orjson  # optional: parses bytes lines directly, much faster on big corpora
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+
+# libyaml loader/emitter when available; no line wrapping for long Chinese values
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+SK_KEY_RE = re.compile(r"sk-[A-Za-z0-9]{10,}")
+
+# YAML post-processing patterns
+FENCE_HEAD_RE = re.compile(r"^```(?:yaml)?\s*", re.IGNORECASE)
+FENCE_TAIL_RE = re.compile(r"\s*```$")
+DASH_NO_SPACE_RE = re.compile(r"^(\s*)-(\S)", re.M)
+# [ \t] rather than \s around the match so a fix never swallows the newline / indentation
+FULLWIDTH_KEY_COLON_RE = re.compile(r"^(\s*[\w\u4e00-\u9fff][\w\u4e00-\u9fff _-]*)：[ \t]*", re.M)
+LENGTH_PERCENT_RE = re.compile(r"^([ \t]*)typical_length_percent:[ \t]*([0-9]+(?:[ \t]*-[ \t]*[0-9]+)?%?)[ \t]*$", re.M)
+WS_RE = re.compile(r"\s+")
+# the indented / blank lines that follow a "pacing_profile:" header
+PACING_BLOCK_RE = re.compile(r"(?:\n(?:  [^\n]*|[^\S\n]*(?=\n|\Z)))*")
+LIST_ITEM_RE = re.compile(r"^\s*-\s*")
+INDENTED_KV_RE = re.compile(r"^\s{2}([^:]+):\s*(.*)$")
+
+
+# -----------------------
+# Corpus IO
+# -----------------------
+
+def _pick_text(o: Any) -> Optional[str]:
+    if isinstance(o, str):
+        return o
+    if isinstance(o, dict):
+        for k in ("text", "content", "paragraph"):
+            v = o.get(k)
+            if isinstance(v, str) and v.strip():
+                return v
+        d = o.get("data")
+        if isinstance(d, dict):
+            t = d.get("text")
+            if isinstance(t, str) and t.strip():
+                return t
+        msgs = o.get("messages")
+        if isinstance(msgs, list):
+            parts = []
+            for m in msgs:
+                if isinstance(m, dict):
+                    c = m.get("content")
+                    if isinstance(c, str) and c.strip():
+                        parts.append(c.strip())
+            if parts:
+                return "\n".join(parts)
+    return None
+
+
+def load_jsonl_texts(jsonl_path: Path, min_len: int = 0, max_len: Optional[int] = None) -> List[str]:
+    """
+    Compat with various jsonl schemas:
+      - {"text": "..."}
+      - {"content": "..."}
+      - {"paragraph": "..."}
+      - {"data": {"text": "..."}}
+      - {"messages":[...]} (fallback: join assistant/user content)
+      - bare JSON strings / non-JSON text lines
+    Returns list of stripped text blocks; blocks shorter than min_len are
+    dropped and longer than max_len truncated.
+    """
+    texts: List[str] = []
+
+    def add(v: str) -> None:
+        # filter/truncate once at ingest so the excerpt sampler only sees usable candidates
+        v = v.strip()
+        if len(v) >= min_len:
+            texts.append(v[:max_len])
+
+    with jsonl_path.open("rb") as f:
+        for raw in f:
+            # the JSON parser skips surrounding whitespace itself, so no per-line strip()
+            # copy; blank lines fail to parse and are dropped in the fallback below
+            try:
+                obj = _json_loads(raw)
+            except Exception:
+                # blank / undecodable bytes / raw text line: same handling as text mode
+                line = raw.decode("utf-8", errors="ignore").strip()
+                if not line:
+                    continue
+                try:
+                    obj = json.loads(line)
+                except Exception:
+                    add(line)
+                    continue
+            t = _pick_text(obj)
+            if t:
+                add(t)
+    return texts
+
+
+def sanitize(s: str) -> str:
+    # Remove obviously sensitive tokens-like strings (avoid leaking keys);
+    # substring scan first, the regex only runs on likely hits
+    if "sk-" in s:
+        s = SK_KEY_RE.sub("[REDACTED_KEY]", s)
+    return s
+
+
+def _iter_shuffled(n: int, rng: random.Random) -> Iterator[int]:
+    """Yield a random permutation of range(n) lazily (sparse Fisher-Yates).
+
+    Only the positions actually drawn are materialized, so stopping after k
+    draws costs O(k) time/memory instead of shuffling all n indices.
+    """
+    swapped: Dict[int, int] = {}
+    for i in range(n):
+        j = rng.randrange(i, n)
+        yield swapped.get(j, j)
+        swapped[j] = swapped.pop(i, i)
+
+
+def excerpt(texts: List[str], max_chars: int, seed: int) -> str:
+    """
+    Random sample of texts concatenated up to max_chars.
+    texts are expected pre-filtered by load_jsonl_texts; only picked ones are redacted.
+    """
+    rng = random.Random(seed)
+    buf: List[str] = []
+    total = 0
+    for i in _iter_shuffled(len(texts), rng):
+        t = sanitize(texts[i])
+        if total + len(t) + 2 > max_chars:
+            break
+        buf.append(t)
+        total += len(t) + 2
+
+    # fallback if nothing selected
+    if not buf:
+        joined = "\n".join(sanitize(x[:1000]) for x in texts[:50] if x)
+        return joined[:max_chars]
+    return "\n\n".join(buf)
+
+
+# -----------------------
+# YAML fixing
+# -----------------------
+
+def strip_fences(s: str) -> str:
+    s = s.strip()
+    s = FENCE_HEAD_RE.sub("", s)
+    s = FENCE_TAIL_RE.sub("", s)
+    return s.strip()
+
+
+def fix_dash_space(s: str) -> str:
+    # "-信息" -> "- 信息"
+    return DASH_NO_SPACE_RE.sub(r"\1- \2", s)
+
+
+def fix_fullwidth_colon_for_keys(s: str) -> str:
+    """
+    Convert 'key： value' -> 'key: value' when it looks like a mapping entry.
+    Don't blindly replace all '：' because it may appear in prose.
+    """
+    return FULLWIDTH_KEY_COLON_RE.sub(r"\1: ", s)
+
+
+def normalize_length_keys(s: str) -> str:
+    """
+    typical_length_percent: 10-15  -> typical_length_ratio: "10-15%"
+    """
+    # percent numeric range; keep the indentation so nested slots stay nested
+    def repl(m: re.Match) -> str:
+        rng = WS_RE.sub("", m.group(2)).replace("%", "")
+        return f'{m.group(1)}typical_length_ratio: "{rng}%"'
+
+    return LENGTH_PERCENT_RE.sub(repl, s)
+
+
+def _find_pacing_header(s: str, pos: int) -> Optional[Tuple[int, int]]:
+    """(start, end) of the next line at/after pos that is exactly "pacing_profile:" once stripped."""
+    while True:
+        idx = s.find("pacing_profile:", pos)
+        if idx < 0:
+            return None
+        start = s.rfind("\n", 0, idx) + 1
+        end = s.find("\n", idx)
+        if end < 0:
+            end = len(s)
+        if s[start:end].strip() == "pacing_profile:":
+            return start, end
+        pos = end
+
+
+def force_pacing_profile_mapping(s: str) -> str:
+    """
+    If pacing_profile is a list, convert into mapping.
+    Example:
+      pacing_profile:
+        - overall_structure: ...
+        - conflict_density: ...
+        -节奏快慢结合：...
+    becomes:
+      pacing_profile:
+        overall_rhythm: ...
+        conflict_density: ...
+        hook_frequency: ...
+        reveal_rhythm: ...
+        tempo_adjustment: ...
+    We keep any extra keys too.
+    """
+    # Text outside pacing_profile blocks is copied through as whole slices;
+    # only the block under each header is split into lines and rewritten.
+    out: List[str] = []
+    pos = 0
+    while True:
+        hdr = _find_pacing_header(s, pos)
+        if hdr is None:
+            out.append(s[pos:])
+            break
+        start, end = hdr
+        out.append(s[pos:start])
+        out.append(s[start:end])
+        blk = PACING_BLOCK_RE.match(s, end)
+        pos = blk.end()
+        # dash / fullwidth-colon fixes already ran over the whole document in postprocess_yaml
+        block = blk.group(0)[1:].split("\n") if blk.group(0) else []
+
+        # If any list item exists under pacing_profile, convert
+        has_list = any(LIST_ITEM_RE.match(b) for b in block)
+        if has_list:
+            items: List[Tuple[str, str]] = []
+            for b in block:
+                b0 = b.rstrip()
+                if not b0.strip():
+                    continue
+                # remove leading "-" if present
+                b0 = LIST_ITEM_RE.sub("  ", b0, count=1)
+                # now expect "  key: value"
+                m = INDENTED_KV_RE.match(b0)
+                if m:
+                    k = m.group(1).strip()
+                    v = m.group(2).strip()
+                    items.append((k, v))
+                else:
+                    # If it's still a plain sentence, put it under tempo_adjustment as list later
+                    items.append(("tempo_adjustment", b0.strip()))
+
+            # Build mapping with canonical keys
+            mp: Dict[str, Any] = {}
+            extras: List[str] = []
+            for k, v in items:
+                if k in mp:
+                    # duplicates -> extras
+                    extras.append(f"{k}: {v}")
+                else:
+                    mp[k] = v
+
+            # Try to rename keys into required schema
+            rename_map = {
+                "overall_structure": "overall_rhythm",
+                "overall_rhythm": "overall_rhythm",
+                "conflict_density": "conflict_density",
+                "hook_frequency": "hook_frequency",
+                "信息揭露节奏": "reveal_rhythm",
+                "节奏调整": "tempo_adjustment",
+                "节奏快慢结合": "tempo_adjustment",
+                "reveal_rhythm": "reveal_rhythm",
+                "tempo_adjustment": "tempo_adjustment",
+            }
+            normalized: Dict[str, Any] = {}
+            for k, v in mp.items():
+                nk = rename_map.get(k, k)
+                normalized[nk] = v
+
+            # ensure required keys exist (fallback strings)
+            normalized.setdefault("overall_rhythm", "起伏分明：先铺垫→冲突加速→信息揭露→阶段收束→章末钩子")
+            normalized.setdefault("conflict_density", "中高（每章至少1-2段冲突/危机）")
+            normalized.setdefault("hook_frequency", "章末必有钩子，部分章节中段可有小钩子")
+            normalized.setdefault("reveal_rhythm", "递进式揭露：碎片线索→局部真相→反转/伏笔回收")
+            normalized.setdefault("tempo_adjustment", "冲突段落紧凑，揭露段落稍缓，收束段落平稳并引出悬念")
+
+            # write mapping block (2 spaces indent)
+            out[-1] = "pacing_profile:"  # replace the header line as written
+            for k in ("overall_rhythm", "conflict_density", "hook_frequency", "reveal_rhythm", "tempo_adjustment"):
+                out.append(f"\n  {k}: {normalized[k]}")
+            # write remaining unknown keys
+            for k, v in normalized.items():
+                if k in ("overall_rhythm", "conflict_density", "hook_frequency", "reveal_rhythm", "tempo_adjustment"):
+                    continue
+                out.append(f"\n  {k}: {v}")
+            # also keep extras if any
+            if extras:
+                out.append("\n  notes:")
+                for e in extras:
+                    out.append(f"\n    - {e}")
+        else:
+            # keep block as-is
+            out.append(blk.group(0))
+
+    return "".join(out)
+
+
+def postprocess_yaml(s: str) -> str:
+    # whole-document regex passes run in C; the pacing_profile walk is the only
+    # Python-level line loop, so it is skipped when there is no such key
+    s = strip_fences(s)
+    s = s.replace("\t", "  ")
+    s = fix_dash_space(s)
+    s = fix_fullwidth_colon_for_keys(s)
+    s = normalize_length_keys(s)
+    # ensure typical_length_ratio exists even if model used percent key
+    s = s.replace("typical_length_percent:", "typical_length_ratio:")
+    if "pacing_profile:" in s:
+        s = force_pacing_profile_mapping(s)
+    return s.strip() + "\n"
+
+
+def parse_yaml_or_raise(s: str) -> Dict[str, Any]:
+    obj = yaml.load(s, Loader=YAML_LOADER)
+    if not isinstance(obj, dict):
+        raise ValueError("YAML root must be mapping")
+    return obj
+
+
+def parse_if_clean(s: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse model output directly when none of the postprocess_yaml fixups
+    apply and pacing_profile is already a flat mapping; None means take the slow path.
+    """
+    s = strip_fences(s)
+    if (
+        "\t" in s
+        or "typical_length_percent" in s
+        or s.count("pacing_profile:") > 1
+        or DASH_NO_SPACE_RE.search(s)
+        or FULLWIDTH_KEY_COLON_RE.search(s)
+    ):
+        return None
+    try:
+        obj = parse_yaml_or_raise(s)
+    except Exception:
+        return None
+    pacing = obj.get("pacing_profile", {} if "pacing_profile:" not in s else None)
+    if not isinstance(pacing, dict) or any(isinstance(v, (list, dict)) for v in pacing.values()):
+        return None
+    return obj
+
+
+def dump_yaml(data: Dict[str, Any], validated_text: Optional[str] = None) -> str:
+    """
+    Canonical YAML for data, or validated_text verbatim when given
+    (text that already parsed to data skips the dump round-trip).
+    """
+    if validated_text is not None:
+        return validated_text.strip() + "\n"
+    return yaml.dump(data, Dumper=YAML_DUMPER, allow_unicode=True, sort_keys=False, default_flow_style=False, width=10_000)
@@ -23,6 +23,13 @@ import random
 from pathlib import Path
 from typing import Any, Dict, List, Tuple
 
+try:
+    import orjson  # type: ignore
+    _json_loads = orjson.loads
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+    _json_loads = json.loads
+
 # If you already have provider factory, use it.
 # Otherwise fallback to OpenAIProvider.
 try:
@@ -74,8 +81,8 @@ def _read_jsonl(path: Path) -> List[Dict[str, Any]]:
             if not line:
                 continue
             try:
-                rows.append(json.loads(line))
-            except json.JSONDecodeError:
+                rows.append(_json_loads(line))
+            except json.JSONDecodeError:  # orjson.JSONDecodeError subclasses it
                 # ignore broken line
                 continue
     if not rows:
@@ -94,7 +101,7 @@ def _bucket_sample(
     Sample paragraphs across chapters to represent style.
     Return (doc_id, sampled_text)
     """
-    random.seed(seed)
+    rng = random.Random(seed)  # same sequence as random.seed(seed), without touching global state
 
     doc_id = str(rows[0].get("doc_id") or "unknown")
     by_ch: Dict[int, List[str]] = {}
@@ -120,13 +127,13 @@ def _bucket_sample(
         if not paras:
             continue
         # sample some paragraphs
-        take = paras_per_chapter if len(paras) >= paras_per_chapter else len(paras)
-        picked = random.sample(paras, take)
-        block = f"\n[CHAPTER {ch}]\n" + "\n".join(f"- {p}" for p in picked)
-        if total + len(block) > max_total_chars:
+        picked = rng.sample(paras, min(paras_per_chapter, len(paras)))
+        block = f"\n[CHAPTER {ch}]\n- " + "\n- ".join(picked)
+        block_len = len(block)
+        if total + block_len > max_total_chars:
             break
         parts.append(block)
-        total += len(block)
+        total += block_len
 
     sampled_text = "\n".join(parts).strip()
     if not sampled_text:
@@ -249,7 +256,10 @@ samples:
 
     out_path = Path(args.out) if args.out else Path("data/knowledge/style_profiles") / f"{doc_id}.json"
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_text(json.dumps(profile, ensure_ascii=False, indent=2), encoding="utf-8")
+    if orjson is not None:
+        out_path.write_bytes(orjson.dumps(profile, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        out_path.write_text(json.dumps(profile, ensure_ascii=False, indent=2), encoding="utf-8")
     print(f"[OK] style_profile saved: {out_path}")
 
 
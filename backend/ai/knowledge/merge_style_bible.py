@@ -5,9 +5,29 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, List
 
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+
+def _load_profile(path: Path) -> Dict[str, Any]:
+    raw = path.read_bytes()
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode("utf-8"))
+
+
+def _dump_json(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
 
 def main():
     ap = argparse.ArgumentParser()
@@ -21,9 +41,9 @@ def main():
     if not files:
         raise SystemExit(f"No profiles found in {d}")
 
-    profiles: List[Dict[str, Any]] = []
-    for f in files:
-        profiles.append(json.loads(f.read_text(encoding="utf-8")))
+    # read+parse in parallel (file I/O releases the GIL); map() keeps sorted order
+    with ThreadPoolExecutor(max_workers=min(32, os.cpu_count() or 4)) as ex:
+        profiles: List[Dict[str, Any]] = list(ex.map(_load_profile, files))
 
     # Very simple merge strategy:
     # - sources: list
@@ -35,7 +55,7 @@ def main():
     }
 
     out.parent.mkdir(parents=True, exist_ok=True)
-    out.write_text(json.dumps(merged, ensure_ascii=False, indent=2), encoding="utf-8")
+    out.write_bytes(_dump_json(merged))
     print(f"[OK] style_bible saved: {out}")
 
 
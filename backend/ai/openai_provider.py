@@ -1,22 +1,232 @@
 # backend/ai/openai_provider.py
 from __future__ import annotations
-from typing import List, Dict, Any
-from openai import OpenAI
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Iterator, List, Dict, Any, Optional
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
 
 from .config import OPENAI_API_KEY, OPENAI_MODEL
 
 Message = Dict[str, Any]
 
+# the SDK retries 429/5xx/connection errors with exponential backoff
+MAX_RETRIES = 3
+REQUEST_TIMEOUT = 120.0
+
+
+@functools.lru_cache(maxsize=1)
+def _shared_client() -> OpenAI:
+    """
+    One OpenAI client (and one keep-alive httpx pool) for every provider instance,
+    so agents and workflows never pay a fresh TLS handshake per call.
+    HTTP/2 is used when the optional `h2` package is installed.
+    """
+    try:
+        import h2  # noqa: F401
+        http2 = True
+    except ImportError:
+        http2 = False
+    http_client = httpx.Client(
+        http2=http2,
+        limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+    )
+    return OpenAI(api_key=OPENAI_API_KEY, http_client=http_client, max_retries=MAX_RETRIES, timeout=REQUEST_TIMEOUT)
+
+
+# Exact-match response cache, opt-in via env:
+#   WRITEBOOK_LLM_CACHE=1    cache deterministic calls (temperature == 0) only
+#   WRITEBOOK_LLM_CACHE=all  cache every call (stochastic outputs get frozen!)
+#   WRITEBOOK_LLM_CACHE_DIR  override ~/.cache/writebook/llm
+_MEM_CACHE_SIZE = 256
+_mem_cache: "OrderedDict[str, str]" = OrderedDict()
+_mem_cache_lock = threading.Lock()  # run_batch / fan-out / worker threads share the LRU
+
+
+def _cache_mode() -> str:
+    return os.getenv("WRITEBOOK_LLM_CACHE", "").strip().lower()
+
+
+def _cache_dir() -> Path:
+    d = os.getenv("WRITEBOOK_LLM_CACHE_DIR")
+    return Path(d).expanduser() if d else Path.home() / ".cache" / "writebook" / "llm"
+
+
+def _cache_key(model: str, messages: List[Message], temperature: float, max_tokens: int) -> str:
+    payload = json.dumps([model, messages, temperature, max_tokens], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=20).hexdigest()
+
+
+def _cache_get(key: str) -> Optional[str]:
+    with _mem_cache_lock:
+        text = _mem_cache.get(key)
+        if text is not None:
+            _mem_cache.move_to_end(key)
+            return text
+    p = _cache_dir() / f"{key}.txt"
+    try:
+        text = p.read_text(encoding="utf-8")
+    except OSError:
+        return None
+    _cache_put_mem(key, text)
+    return text
+
+
+def _cache_put_mem(key: str, text: str) -> None:
+    with _mem_cache_lock:
+        _mem_cache[key] = text
+        _mem_cache.move_to_end(key)
+        while len(_mem_cache) > _MEM_CACHE_SIZE:
+            _mem_cache.popitem(last=False)
+
+
+def _cache_put(key: str, text: str) -> None:
+    _cache_put_mem(key, text)
+    d = _cache_dir()
+    try:
+        d.mkdir(parents=True, exist_ok=True)
+        tmp = d / f"{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, d / f"{key}.txt")  # atomic: concurrent runs never see a half-written entry
+    except OSError:
+        pass  # cache is best-effort
+
+
+def _cache_key_if_enabled(model: str, messages: List[Message], temperature: float, max_tokens: int) -> Optional[str]:
+    mode = _cache_mode()
+    if mode not in ("1", "true", "all") or (temperature > 0 and mode != "all"):
+        return None
+    return _cache_key(model, messages, temperature, max_tokens)
+
+
+def _cached_chat(fn: Callable[..., str]) -> Callable[..., str]:
+    @functools.wraps(fn)
+    def wrapper(self: "OpenAIProvider", messages: List[Message], temperature: float = 0.7, max_tokens: int = 2000) -> str:
+        key = _cache_key_if_enabled(self.model, messages, temperature, max_tokens)
+        if key is None:
+            return fn(self, messages, temperature=temperature, max_tokens=max_tokens)
+        hit = _cache_get(key)
+        if hit is not None:
+            return hit
+        text = fn(self, messages, temperature=temperature, max_tokens=max_tokens)
+        if text:
+            _cache_put(key, text)
+        return text
+    return wrapper
+
+
+# OpenAI prompt caching is automatic for identical >=1024-token prefixes; a stable
+# prompt_cache_key per system prompt routes those requests to the same cache shard.
+_PROMPT_CACHE_MODELS = ("gpt-4o", "gpt-4.1", "gpt-5", "o1", "o3", "o4")
+
+
+# leading chars of the first user message folded into the cache key: templates put their
+# static blocks (style bible, spec, rules) first, so this routes calls that share a prefix together
+_PROMPT_CACHE_PREFIX_CHARS = 2048
+
+
+def _prompt_cache_extra(model: str, messages: List[Message]) -> Dict[str, Any]:
+    if not model.startswith(_PROMPT_CACHE_MODELS):
+        return {}  # OpenAI-compatible servers may reject unknown params
+    system = next((m.get("content") for m in messages if m.get("role") == "system"), None)
+    if not isinstance(system, str) or not system:
+        return {}
+    user = next((m.get("content") for m in messages if m.get("role") == "user"), None)
+    prefix = system + "\0" + (user[:_PROMPT_CACHE_PREFIX_CHARS] if isinstance(user, str) else "")
+    return {"extra_body": {"prompt_cache_key": hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:32]}}
+
+
 class OpenAIProvider:
-    def __init__(self) -> None:
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
+    def __init__(self, client: Optional[OpenAI] = None) -> None:
+        self.client = client if client is not None else _shared_client()
         self.model = OPENAI_MODEL
 
+    @_cached_chat
     def chat(self, messages: List[Message], temperature: float = 0.7, max_tokens: int = 2000) -> str:
         resp = self.client.chat.completions.create(
             model=self.model,
             messages=messages,
             temperature=temperature,
             max_tokens=max_tokens,
+            **_prompt_cache_extra(self.model, messages),
         )
         return resp.choices[0].message.content or ""
+
+    def chat_stream(self, messages: List[Message], temperature: float = 0.7, max_tokens: int = 2000) -> Iterator[str]:
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            **_prompt_cache_extra(self.model, messages),
+        )
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            # a consumer that stops early (generator close) also drops the HTTP response,
+            # so the server stops generating instead of running to max_tokens
+            stream.close()
+
+
+class AsyncOpenAIProvider:
+    """
+    asyncio flavour of OpenAIProvider, for fanning out independent prompts
+    with asyncio.gather(). Shares the response cache with the sync provider.
+    """
+
+    def __init__(self, client: Optional[AsyncOpenAI] = None) -> None:
+        self._client = client
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.model = OPENAI_MODEL
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        # an async connection pool is bound to the loop that created it;
+        # rebuild it when reused from a new asyncio.run()
+        loop = asyncio.get_running_loop()
+        if self._client is None or (self._loop is not None and self._loop is not loop):
+            old, old_loop = self._client, self._loop
+            if old is not None and old_loop is not None and old_loop.is_running():
+                # still alive on another thread: close its pool there
+                asyncio.run_coroutine_threadsafe(old.close(), old_loop)
+            # otherwise its loop is gone and the pool cannot be awaited any more; drop it
+            self._client = AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=MAX_RETRIES, timeout=REQUEST_TIMEOUT)
+            self._loop = loop
+        return self._client
+
+    async def aclose(self) -> None:
+        """
+        Close the connection pool; call before the event loop that used this provider ends.
+        """
+        if self._client is not None and self._loop is not None:
+            client, self._client, self._loop = self._client, None, None
+            await client.close()
+
+    async def chat(self, messages: List[Message], temperature: float = 0.7, max_tokens: int = 2000) -> str:
+        key = _cache_key_if_enabled(self.model, messages, temperature, max_tokens)
+        if key is not None:
+            # cache lookups touch disk: keep them off the event loop
+            hit = await asyncio.to_thread(_cache_get, key)
+            if hit is not None:
+                return hit
+        resp = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **_prompt_cache_extra(self.model, messages),
+        )
+        text = resp.choices[0].message.content or ""
+        if key is not None and text:
+            await asyncio.to_thread(_cache_put, key, text)
+        return text
@@ -1,8 +1,9 @@
 # backend/ai/provider.py
 from __future__ import annotations
 
+import functools
 from dataclasses import dataclass
-from typing import Any, Dict, List, Protocol
+from typing import Any, Dict, Iterator, List, Protocol, Union
 
 Message = Dict[str, Any]
 
@@ -16,17 +17,46 @@ class AIProvider(Protocol):
     ) -> str:
         ...
 
+    def chat_stream(
+        self,
+        messages: List[Message],
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+    ) -> Iterator[str]:
+        """
+        Same as chat(), but yields text deltas as the model produces them.
+        """
+        ...
+
+
+class AsyncAIProvider(Protocol):
+    async def chat(
+        self,
+        messages: List[Message],
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+    ) -> str:
+        ...
+
+    async def aclose(self) -> None:
+        ...
+
 
 @dataclass
 class ProviderConfig:
     provider: str = "openai"
 
 
-def get_ai_provider(provider: str = "openai") -> AIProvider:
+@functools.lru_cache(maxsize=4)
+def get_ai_provider(provider: str = "openai", async_: bool = False) -> Union[AIProvider, AsyncAIProvider]:
     """
-    Factory to return an AI provider instance.
+    Factory to return an AI provider instance (async_=True: awaitable chat()).
+    Memoized: every caller shares one instance (and its connection pool) per provider name.
     """
     if provider == "openai":
+        if async_:
+            from .openai_provider import AsyncOpenAIProvider  # lazy import
+            return AsyncOpenAIProvider()
         from .openai_provider import OpenAIProvider  # lazy import
         return OpenAIProvider()
     raise ValueError(f"Unknown provider: {provider}")
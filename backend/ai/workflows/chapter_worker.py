@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Long-running chapter worker.
+
+Every `python -m backend.ai.workflows.run_chapter` pays interpreter start-up,
+imports, .env loading and a fresh TLS handshake before the first token. The
+worker pays that once: it keeps one provider (and its HTTP connection pool),
+one WriterAgent per templates dir and the mtime-keyed file caches warm, and
+runs chapter jobs sent over a Unix socket.
+
+Protocol: newline-delimited JSON. Each request line is one job
+  {"project": "...", "chapter": 3, "style_bible": "...",
+   "templates_dir"?, "knowledge_dir"?, "max_rewrite"?, "review"?, "rewrite_fanout"?}
+and gets one response line {"ok": true, "chapter": 3, "path": "..."} or
+{"ok": false, "chapter": 3, "error": "..."}. Jobs on one connection run in order
+(chapter N reads chapter N-1's memory); separate connections run concurrently.
+A client can pipeline all of its jobs and read the responses afterwards.
+
+Usage:
+  python -m backend.ai.workflows.chapter_worker serve --socket /tmp/writebook.sock
+  python -m backend.ai.workflows.chapter_worker submit --socket /tmp/writebook.sock \
+    --project data/projects/book_001 --chapters 1-20 \
+    --style_bible data/knowledge/style_profiles/style_bible.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+from pathlib import Path
+from typing import Any, Dict
+
+from backend.ai.agents.writer import WriterAgent
+from backend.ai.provider import get_ai_provider
+from backend.ai.workflows.run_chapter import add_cache_args, apply_cache_args, load_project_context, run_one_chapter
+from backend.ai.workflows.run_chapters import parse_chapters
+
+DEFAULT_TEMPLATES_DIR = "backend/ai/prompts/templates"
+DEFAULT_KNOWLEDGE_DIR = "data/knowledge"
+
+_writers: Dict[str, WriterAgent] = {}
+_writers_lock = threading.Lock()
+
+
+def _writer(provider, templates_dir: Path) -> WriterAgent:
+    with _writers_lock:
+        w = _writers.get(str(templates_dir))
+        if w is None:
+            w = _writers[str(templates_dir)] = WriterAgent(provider, templates_dir)
+        return w
+
+
+def run_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Same steps as run_chapter.main() for one {"project", "chapter", "style_bible", ...} job.
+    Project files are re-read through the mtime caches, so edits between jobs are picked up.
+    """
+    n = int(job["chapter"])
+    templates_dir = Path(job.get("templates_dir") or DEFAULT_TEMPLATES_DIR)
+    ctx = load_project_context(
+        Path(job["project"]),
+        templates_dir,
+        Path(job["style_bible"]),
+        Path(job.get("knowledge_dir") or DEFAULT_KNOWLEDGE_DIR),
+    )
+    provider = get_ai_provider()
+    path = run_one_chapter(
+        ctx,
+        provider,
+        _writer(provider, templates_dir),
+        n,
+        int(job.get("max_rewrite", 3)),
+        review=bool(job.get("review")),
+        rewrite_fanout=int(job.get("rewrite_fanout", 1)),
+    )
+    return {"ok": True, "chapter": n, "path": str(path)}
+
+
+class _JobHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+            job: Any = {}
+            try:
+                job = json.loads(line)
+                if not isinstance(job, dict):
+                    job = {}
+                    raise ValueError("job must be a JSON object")
+                resp = run_job(job)
+            except Exception as e:  # report and keep serving
+                resp = {"ok": False, "chapter": job.get("chapter"), "error": f"{type(e).__name__}: {e}"}
+            self.wfile.write((json.dumps(resp, ensure_ascii=False) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _remove_stale_socket(sock_path: str) -> None:
+    """
+    Unlink sock_path only if it is a socket nobody is listening on (left by a crashed worker).
+    A live worker's socket or any other kind of file is an error, never deleted.
+    """
+    try:
+        mode = os.stat(sock_path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise SystemExit(f"[ERR] {sock_path} exists and is not a socket")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        try:
+            s.connect(sock_path)
+        except ConnectionRefusedError:
+            os.unlink(sock_path)
+            return
+    raise SystemExit(f"[ERR] a worker is already listening on {sock_path}")
+
+
+def serve(sock_path: str) -> None:
+    _remove_stale_socket(sock_path)
+    get_ai_provider()  # warm the provider / connection pool before the first job
+    with _Server(sock_path, _JobHandler) as server:
+        print(f"[OK] chapter worker listening on {sock_path}")
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(sock_path)
+
+
+def submit(sock_path: str, jobs: list) -> bool:
+    """
+    Send every job, then read one response per job. Returns True if all succeeded;
+    a connection closed before every job was answered counts as failure.
+    """
+    ok = True
+    answered = 0
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.connect(sock_path)
+        s.sendall("".join(json.dumps(j, ensure_ascii=False) + "\n" for j in jobs).encode("utf-8"))
+        s.shutdown(socket.SHUT_WR)
+        with s.makefile("r", encoding="utf-8") as f:
+            for line in f:
+                resp = json.loads(line)
+                answered += 1
+                if resp.get("ok"):
+                    print(f"[OK] ch{int(resp['chapter']):02d} -> {resp['path']}")
+                else:
+                    ok = False
+                    print(f"[ERR] ch{resp.get('chapter')}: {resp.get('error')}")
+    if answered < len(jobs):
+        print(f"[ERR] worker closed the connection after {answered}/{len(jobs)} jobs")
+        return False
+    return ok
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    sp = sub.add_parser("serve", help="Run the worker")
+    sp.add_argument("--socket", required=True)
+    add_cache_args(sp)
+
+    cp = sub.add_parser("submit", help="Send chapter jobs to a running worker")
+    cp.add_argument("--socket", required=True)
+    cp.add_argument("--project", required=True, help="e.g. data/projects/book_001")
+    cp.add_argument("--chapters", required=True, help='e.g. "1-20" or "1,3,5-7"')
+    cp.add_argument("--templates_dir", default=DEFAULT_TEMPLATES_DIR)
+    cp.add_argument("--style_bible", required=True, help="e.g. data/knowledge/style_profiles/style_bible.json")
+    cp.add_argument("--knowledge_dir", default=DEFAULT_KNOWLEDGE_DIR)
+    cp.add_argument("--max_rewrite", type=int, default=3)
+    cp.add_argument("--review", action="store_true")
+    cp.add_argument("--rewrite_fanout", type=int, default=1)
+    args = ap.parse_args()
+
+    if args.cmd == "serve":
+        apply_cache_args(args)
+        serve(args.socket)
+        return
+
+    # paths are resolved here: the worker may run from a different cwd
+    base = {
+        "project": str(Path(args.project).resolve()),
+        "templates_dir": str(Path(args.templates_dir).resolve()),
+        "style_bible": str(Path(args.style_bible).resolve()),
+        "knowledge_dir": str(Path(args.knowledge_dir).resolve()),
+        "max_rewrite": args.max_rewrite,
+        "review": args.review,
+        "rewrite_fanout": args.rewrite_fanout,
+    }
+    if not submit(args.socket, [dict(base, chapter=n) for n in parse_chapters(args.chapters)]):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
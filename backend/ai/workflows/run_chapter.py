@@ -4,14 +4,25 @@
 from __future__ import annotations
 
 import argparse
+import functools
+import hashlib
 import json
+import os
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import yaml
 
+try:
+    import orjson  # optional: faster JSON for memory files
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+from backend.ai.agents.editor import EditorAgent
 from backend.ai.agents.writer import WriterAgent
 
 # provider 获取（项目里一般二选一）
@@ -23,6 +34,9 @@ except Exception:
 
 YamlObj = Union[Dict[str, Any], list]
 
+# libyaml loader when available
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 
 @dataclass
 class ChapterObj:
@@ -34,19 +48,53 @@ class ChapterObj:
 # =========================
 # IO helpers
 # =========================
+def _file_key(p: Path) -> Optional[Tuple[str, int, int]]:
+    """(path, mtime_ns, size) cache key, or None when the file does not exist."""
+    try:
+        st = p.stat()
+    except OSError:
+        return None
+    return str(p), st.st_mtime_ns, st.st_size
+
+
+# Parsed results are cached per (path, mtime, size): batch runs and repeated loads
+# of an unchanged file skip the disk read and the parse. Callers treat them as read-only.
+@functools.lru_cache(maxsize=256)
+def _cached_text(path: str, mtime_ns: int, size: int) -> str:
+    return Path(path).read_text(encoding="utf-8").strip()
+
+
+@functools.lru_cache(maxsize=256)
+def _cached_yaml(path: str, mtime_ns: int, size: int) -> Any:
+    txt = _cached_text(path, mtime_ns, size)
+    return yaml.load(txt, Loader=YAML_LOADER) if txt else None
+
+
+def _json_loads(s: Union[str, bytes]) -> Any:
+    return orjson.loads(s) if orjson is not None else json.loads(s)
+
+
+def _json_dumps(obj: Any) -> str:
+    # same layout as json.dumps(obj, ensure_ascii=False, indent=2)
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, indent=2)
+
+
 def _read_text(p: Path) -> str:
-    if not p.exists():
+    key = _file_key(p)
+    if key is None:
         raise RuntimeError(f"File not found: {p}")
-    return p.read_text(encoding="utf-8").strip()
+    return _cached_text(*key)
 
 
 def _read_yaml(p: Path) -> YamlObj:
-    if not p.exists():
+    key = _file_key(p)
+    if key is None:
         raise RuntimeError(f"YAML file not found: {p}")
-    txt = p.read_text(encoding="utf-8").strip()
-    if not txt:
+    if not _cached_text(*key):
         raise RuntimeError(f"YAML file is empty: {p}")
-    obj = yaml.safe_load(txt)
+    obj = _cached_yaml(*key)
     if not isinstance(obj, (dict, list)):
         raise RuntimeError(f"Invalid YAML root (expected mapping/list): {p}")
     return obj
@@ -58,57 +106,167 @@ def _yaml_dump(obj: Any) -> str:
     return yaml.safe_dump(obj, allow_unicode=True, sort_keys=False)
 
 
+def _compact_json_text(text: str) -> str:
+    """
+    Re-dump JSON text without indentation (fewer prompt tokens); non-JSON text is returned as-is.
+    """
+    try:
+        obj = _json_loads(text)
+    except Exception:
+        return text
+    if not isinstance(obj, (dict, list)):
+        return text
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
 def _read_json(p: Path) -> Dict[str, Any]:
     if not p or not p.exists():
         return {}
     try:
-        v = json.loads(p.read_text(encoding="utf-8"))
+        v = _json_loads(p.read_bytes())
         return v if isinstance(v, dict) else {}
     except Exception:
         return {}
 
 
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+
+
 def _write_text(p: Path, s: str) -> None:
-    p.parent.mkdir(parents=True, exist_ok=True)
-    p.write_text(s, encoding="utf-8")
+    # raw fd write: no TextIOWrapper, and mkdir only when the directory is actually missing
+    data = s.encode("utf-8")
+    try:
+        fd = os.open(p, _WRITE_FLAGS, 0o666)
+    except FileNotFoundError:
+        p.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(p, _WRITE_FLAGS, 0o666)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+# Bump when _yaml_dump / _format_chapter_outline_for_prompt change their output,
+# so sidecars written by an older build are rebuilt instead of replayed.
+_SIDECAR_FORMAT = 2
+
+
+def _sidecar_dir(project_dir: Path) -> Path:
+    """
+    Tool-owned home for the compiled-prompt sidecars of one project (nothing is written
+    into the project itself). WRITEBOOK_SIDECAR_DIR overrides ~/.cache/writebook/compiled.
+    """
+    d = os.getenv("WRITEBOOK_SIDECAR_DIR")
+    root = Path(d).expanduser() if d else Path.home() / ".cache" / "writebook" / "compiled"
+    tag = hashlib.blake2b(str(project_dir.resolve()).encode("utf-8"), digest_size=8).hexdigest()
+    return root / f"{project_dir.name}-{tag}"
+
+
+def _compiled_text(cache_dir: Path, name: str, src: Path, build: Callable[[], str]) -> str:
+    """
+    Prompt text derived from src (e.g. the YAML dump of spec.yml), kept in cache_dir/name.
+    The first line of the sidecar records the sidecar format and src's (mtime_ns, size);
+    build() only runs when either changed, so per-chapter processes reuse the dump
+    instead of re-serializing.
+    """
+    key = _file_key(src)
+    if key is None:
+        return build()
+    stamp = f"v{_SIDECAR_FORMAT} {key[1]} {key[2]}"
+    side = cache_dir / name
+    try:
+        head, _, body = side.read_text(encoding="utf-8").partition("\n")
+        if head == stamp:
+            return body
+    except OSError:
+        pass
+    text = build()
+    try:
+        side.parent.mkdir(parents=True, exist_ok=True)
+        tmp = side.with_name(f"{side.name}.{os.getpid()}.tmp")
+        tmp.write_text(f"{stamp}\n{text}", encoding="utf-8")
+        os.replace(tmp, side)  # atomic: concurrent runs never read a half-written sidecar
+    except OSError:
+        pass  # read-only project dir: just skip the sidecar
+    return text
 
 
 # =========================
 # Outline parsing
 # =========================
-def _load_chapter_outline(outline_yml: YamlObj, n: int) -> ChapterObj:
+OutlineIndex = Tuple[Dict[int, Dict[str, Any]], bool]
+
+
+def _outline_items(outline_yml: YamlObj) -> Optional[list]:
+    """The chapter list _load_chapter_outline scans (None for the {chapters: {"1": ...}} form)."""
+    if isinstance(outline_yml, dict):
+        if "chapters" in outline_yml:
+            chapters = outline_yml["chapters"]
+            return chapters if isinstance(chapters, list) else None
+        if isinstance(outline_yml.get("outline"), list):
+            return outline_yml["outline"]
+        return None
+    if isinstance(outline_yml, list):
+        return outline_yml
+    return None
+
+
+def _index_outline(outline_yml: YamlObj) -> OutlineIndex:
+    """
+    {number: item} for the chapter list (first occurrence wins, like the scan), plus whether
+    indexing stopped at an item whose number is not an int; lookups past it fall back to the scan.
+    """
+    idx: Dict[int, Dict[str, Any]] = {}
+    for item in _outline_items(outline_yml) or ():
+        if not isinstance(item, dict):
+            continue
+        try:
+            k = int(item.get("number", -1))
+        except (TypeError, ValueError):
+            return idx, True
+        idx.setdefault(k, item)
+    return idx, False
+
+
+@functools.lru_cache(maxsize=64)
+def _cached_outline_index(path: str, mtime_ns: int, size: int) -> OutlineIndex:
+    return _index_outline(_cached_yaml(path, mtime_ns, size))
+
+
+def _scan_chapters(items: list, n: int) -> Optional[Dict[str, Any]]:
+    for item in items:
+        if isinstance(item, dict) and int(item.get("number", -1)) == n:
+            return item
+    return None
+
+
+def _load_chapter_outline(outline_yml: YamlObj, n: int, index: Optional[OutlineIndex] = None) -> ChapterObj:
     """
     支持：
       1) {chapters: [ {number:1,...}, ... ]}
       2) {outline:  [ {number:1,...}, ... ]}
       3) [ {number:1,...}, ... ]
+      4) {chapters: {"1": {...}, ...}}
+    index: _index_outline(outline_yml)，给了就 O(1) 查章节，不再线性扫描
     """
     ch: Optional[Dict[str, Any]] = None
 
-    if isinstance(outline_yml, dict):
-        if "chapters" in outline_yml:
-            chapters = outline_yml["chapters"]
-            if isinstance(chapters, list):
-                for item in chapters:
-                    if isinstance(item, dict) and int(item.get("number", -1)) == n:
-                        ch = item
-                        break
-            elif isinstance(chapters, dict):
-                v = chapters.get(str(n))
-                if isinstance(v, dict):
-                    ch = v
-
-        elif isinstance(outline_yml.get("outline"), list):
-            for item in outline_yml["outline"]:
-                if isinstance(item, dict) and int(item.get("number", -1)) == n:
-                    ch = item
-                    break
-
-    elif isinstance(outline_yml, list):
-        for item in outline_yml:
-            if isinstance(item, dict) and int(item.get("number", -1)) == n:
-                ch = item
-                break
+    items = _outline_items(outline_yml)
+    if items is not None:
+        if index is not None:
+            ch = index[0].get(n)
+            if ch is None and index[1]:
+                ch = _scan_chapters(items, n)  # 索引不完整：照旧扫描（坏编号照旧报错）
+        else:
+            ch = _scan_chapters(items, n)
+    elif isinstance(outline_yml, dict) and isinstance(outline_yml.get("chapters"), dict):
+        v = outline_yml["chapters"].get(str(n))
+        if isinstance(v, dict):
+            ch = v
 
     if ch is None:
         raise RuntimeError(f"Chapter {n} not found in outline.yml")
@@ -138,7 +296,7 @@ def _extract_protagonist_name(cast_bible_text: str) -> str:
     从 cast_bible.yml 提取 protagonist.name
     """
     try:
-        obj = yaml.safe_load(cast_bible_text)
+        obj = yaml.load(cast_bible_text, Loader=YAML_LOADER)
         if isinstance(obj, dict):
             pro = obj.get("protagonist")
             if isinstance(pro, dict):
@@ -150,33 +308,69 @@ def _extract_protagonist_name(cast_bible_text: str) -> str:
     return "主角"
 
 
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[。！？!?])\s*")
+# 漂移检测用的误名黑名单（还有其他常见漂移名可以往这里加）
+BANNED_NAMES = ("沈墨",)
+# 所有误名合成一个交替正则：名单再长也只扫一遍开头
+BANNED_NAMES_RE = re.compile("|".join(map(re.escape, BANNED_NAMES)))
+
+
 def _first_n_sentences(text: str, n: int = 3) -> str:
-    parts = re.split(r"(?<=[。！？!?])\s*", (text or "").strip())
+    # maxsplit: 只切出前 n 句，不扫描整章
+    parts = SENTENCE_SPLIT_RE.split((text or "").strip(), maxsplit=n)
     return "".join(parts[:n]).strip()
 
 
 def _protagonist_ok(text: str, protagonist: str) -> bool:
     if not text or not protagonist:
         return False
-    head3 = _first_n_sentences(text, 3)
     # 规则：前三句必须出现主角名；全文至少出现 2 次
-    return (protagonist in head3) and (text.count(protagonist) >= 2)
+    first = text.find(protagonist)
+    if first < 0 or protagonist not in _first_n_sentences(text, 3):
+        return False
+    # 只需找到第 2 次出现，不必数完整章
+    return text.find(protagonist, first + len(protagonist)) >= 0
 
 
 def _contains_banned_name(text: str, protagonist: str) -> bool:
     """
     硬杀你截图里出现过的误名：沈墨
-    你如果还有其他常见漂移名，可以往 blacklist 里加。
+    你如果还有其他常见漂移名，可以往 BANNED_NAMES 里加。
     """
     if not text:
         return True
-    blacklist = ["沈墨"]
     head = (text[:400] or "")
     # 如果开头没有主角且出现黑名单名，直接判定漂移
-    for b in blacklist:
-        if b in head and protagonist not in head:
-            return True
-    return False
+    if protagonist in head:
+        return False
+    return BANNED_NAMES_RE.search(head) is not None
+
+
+def _drifted(text: str, protagonist: str) -> bool:
+    return (not _protagonist_ok(text, protagonist)) or _contains_banned_name(text, protagonist)
+
+
+def _first_ok(
+    draft: Callable[[float, threading.Event], str], temperatures: List[float], ok: Callable[[str], bool]
+) -> str:
+    """
+    Run draft(t, stop) for every temperature concurrently and return the first result that passes
+    ok(); if none does, the last one to finish. Once a winner is found stop is set: draft() must
+    poll it and abandon its request (close the stream), otherwise the losers keep generating
+    (and billing) until they finish on their own. Stragglers are not waited for.
+    """
+    stop = threading.Event()
+    ex = ThreadPoolExecutor(max_workers=len(temperatures))
+    try:
+        text = ""
+        for f in as_completed([ex.submit(draft, t, stop) for t in temperatures]):
+            text = f.result()
+            if ok(text):
+                break
+        return text
+    finally:
+        stop.set()
+        ex.shutdown(wait=False, cancel_futures=True)
 
 
 def _enforce_opening(text: str, opening: str, protagonist: str) -> str:
@@ -195,6 +389,9 @@ def _enforce_opening(text: str, opening: str, protagonist: str) -> str:
 # =========================
 # Template render (writer.md)
 # =========================
+WRITER_PLACEHOLDER_RE = re.compile(r"\{(style_bible|spec|chapter_outline|memory|knowledge)\}")
+
+
 def _render_writer_template(
     writer_md: str,
     *,
@@ -204,18 +401,41 @@ def _render_writer_template(
     memory: str,
     knowledge: str,
 ) -> str:
-    out = writer_md
-    out = out.replace("{style_bible}", style_bible)
-    out = out.replace("{spec}", spec)
-    out = out.replace("{chapter_outline}", chapter_outline)
-    out = out.replace("{memory}", memory)
-    out = out.replace("{knowledge}", knowledge)
-    return out
+    # 单次扫描替换 5 个占位符；模板里其它花括号原样保留，替换进来的内容不会被再次展开
+    values = {
+        "style_bible": style_bible,
+        "spec": spec,
+        "chapter_outline": chapter_outline,
+        "memory": memory,
+        "knowledge": knowledge,
+    }
+    return WRITER_PLACEHOLDER_RE.sub(lambda m: values[m.group(1)], writer_md)
 
 
 # =========================
 # Memory builder (optional but useful)
 # =========================
+JSON_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.I)
+SENTENCE_END_RE = re.compile(r"[。！？!?]")
+
+
+def _truncate_for_memory(text: str, head: int = 2000, tail: int = 4000) -> str:
+    """
+    Head (who is on stage) + tail (where the chapter ends) for the memory prompt; the middle is
+    dropped. Both cuts are moved to sentence ends so no sentence is sent half-finished.
+    """
+    text = text or ""
+    if len(text) <= head + tail:
+        return text
+    h = max(text.rfind(c, 0, head) for c in "。！？!?")
+    head_end = h + 1 if h >= 0 else head
+    tail_start = len(text) - tail
+    m = SENTENCE_END_RE.search(text, tail_start)
+    if m is not None and m.end() < len(text):
+        tail_start = m.end()
+    return text[:head_end] + "\n...[omitted]...\n" + text[tail_start:].lstrip()
+
+
 def _build_memory(provider, chapter_text: str, max_tokens: int = 900) -> Dict[str, Any]:
     system = (
         "You are a writing assistant.\n"
@@ -224,37 +444,73 @@ def _build_memory(provider, chapter_text: str, max_tokens: int = 900) -> Dict[st
         "Keys: summary, characters, plot_points, world_facts, open_threads.\n"
         "Keep it concise."
     )
-    user = f"CHAPTER:\n{(chapter_text or '')[:12000]}"
+    user = f"CHAPTER:\n{_truncate_for_memory(chapter_text)}"
     resp = provider.chat(
         messages=[{"role": "system", "content": system}, {"role": "user", "content": user}],
         temperature=0.1,
         max_tokens=max_tokens,
     )
     try:
-        obj = json.loads(resp)
+        obj = _json_loads(JSON_FENCE_RE.sub("", resp))
         return obj if isinstance(obj, dict) else {"summary": resp}
     except Exception:
         return {"summary": resp}
 
 
 # =========================
-# Main
+# Project context (loaded once, shared by every chapter)
 # =========================
-def main() -> None:
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--project", required=True, help="e.g. data/projects/book_001")
-    ap.add_argument("--chapter", required=True, type=int)
-    ap.add_argument("--templates_dir", default="backend/ai/prompts/templates")
-    ap.add_argument("--style_bible", required=True, help="e.g. data/knowledge/style_profiles/style_bible.json")
-    ap.add_argument("--knowledge_dir", default="data/knowledge")
+@dataclass
+class ProjectContext:
+    project_dir: Path
+    templates_dir: Path
+    spec_obj: YamlObj
+    spec_text: str
+    outline_obj: YamlObj
+    cast_bible_text: str
+    protagonist: str
+    style_bible_text: str
+    writer_md: str
+    knowledge_pack: str
+    forced_opening: str
+    outline_index: Optional[OutlineIndex] = None
 
-    # WriterAgent.write 不吃这两个参数，但留着以后升级用
-    ap.add_argument("--max_rewrite", type=int, default=3)
-    args = ap.parse_args()
+    @property
+    def memory_dir(self) -> Path:
+        return self.project_dir / "memory"
+
+    @property
+    def cache_dir(self) -> Path:
+        return _sidecar_dir(self.project_dir)
+
+    @property
+    def spec_for_writer(self) -> Dict[str, Any]:
+        return self.spec_obj if isinstance(self.spec_obj, dict) else {"spec": self.spec_obj}
+
+
+EXTRA_KNOWLEDGE_FILES = ("world.md", "lore.md", "glossary.yml")
 
-    project_dir = Path(args.project)
-    templates_dir = Path(args.templates_dir)
 
+def _read_extra_knowledge(knowledge_dir: Path) -> List[Tuple[str, str]]:
+    """
+    (name, stripped text) for each EXTRA_KNOWLEDGE_FILES entry present in knowledge_dir, in that order.
+    One directory listing instead of a stat per candidate; reads go through the mtime cache.
+    """
+    try:
+        with os.scandir(knowledge_dir) as it:
+            found = {e.name: e for e in it if e.name in EXTRA_KNOWLEDGE_FILES and e.is_file()}
+    except OSError:
+        return []
+    out = []
+    for name in EXTRA_KNOWLEDGE_FILES:
+        e = found.get(name)
+        if e is not None:
+            st = e.stat()
+            out.append((name, _cached_text(e.path, st.st_mtime_ns, st.st_size)))
+    return out
+
+
+def load_project_context(project_dir: Path, templates_dir: Path, style_bible: Path, knowledge_dir: Path) -> ProjectContext:
     # 项目文件
     spec_path = project_dir / "spec.yml"
     outline_path = project_dir / "outline.yml"
@@ -274,37 +530,39 @@ def main() -> None:
     if not writer_md_path.exists():
         raise RuntimeError(f"Missing writer.md: {writer_md_path}")
 
-    # 读取输入
+    # 读取输入（YAML dump 结果落盘到工具自己的缓存目录，源文件不变就直接复用）
+    cache_dir = _sidecar_dir(project_dir)
     spec_obj = _read_yaml(spec_path)
-    spec_text = _yaml_dump(spec_obj)
+    spec_text = _compiled_text(cache_dir, "spec.compiled.txt", spec_path, lambda: _yaml_dump(spec_obj))
 
     outline_obj = _read_yaml(outline_path)
-    ch = _load_chapter_outline(outline_obj, args.chapter)
-    chapter_outline_str = _format_chapter_outline_for_prompt(ch)
+    # 章节号 -> 大纲条目，按文件 mtime 缓存（文件在两次读取之间被改了就现建）
+    key = _file_key(outline_path)
+    if key is not None and _cached_yaml(*key) is outline_obj:
+        outline_index = _cached_outline_index(*key)
+    else:
+        outline_index = _index_outline(outline_obj)
 
     cast_bible_text = _read_text(cast_bible_path)
     protagonist = _extract_protagonist_name(cast_bible_text)
 
-    style_bible_text = _read_text(Path(args.style_bible))
+    style_bible_text = _compact_json_text(_read_text(style_bible))
     writer_md = _read_text(writer_md_path)
 
-    # 记忆
-    memory_dir = project_dir / "memory"
-    prev_mem_path = memory_dir / f"ch{args.chapter-1:02d}.json" if args.chapter > 1 else None
-    prev_memory = _read_json(prev_mem_path) if prev_mem_path else {}
-    memory_str = json.dumps(prev_memory, ensure_ascii=False, indent=2) if prev_memory else ""
-
     # project_spec_outline 工具箱（可选，但你说你要用）
     proj_outline_text = ""
     if proj_outline_path.exists():
-        proj_outline_text = _yaml_dump(_read_yaml(proj_outline_path))
+        proj_outline_text = _compiled_text(
+            cache_dir,
+            "project_spec_outline.compiled.txt",
+            proj_outline_path,
+            lambda: _yaml_dump(_read_yaml(proj_outline_path)),
+        )
 
     # extra knowledge（可选）
-    knowledge_str = ""
-    kb_dir = Path(args.knowledge_dir)
-    for candidate in [kb_dir / "world.md", kb_dir / "lore.md", kb_dir / "glossary.yml"]:
-        if candidate.exists():
-            knowledge_str += f"\n\n=== EXTRA_KNOWLEDGE ({candidate.name}) ===\n{candidate.read_text(encoding='utf-8').strip()}\n"
+    knowledge_str = "".join(
+        f"\n\n=== EXTRA_KNOWLEDGE ({name}) ===\n{text}\n" for name, text in _read_extra_knowledge(knowledge_dir)
+    )
 
     # 强约束 + cast + toolkit
     knowledge_pack = (
@@ -329,20 +587,85 @@ def main() -> None:
         f"{protagonist}知道，今夜之后，一切都会变得不同。"
     )
 
+    return ProjectContext(
+        project_dir=project_dir,
+        templates_dir=templates_dir,
+        spec_obj=spec_obj,
+        spec_text=spec_text,
+        outline_obj=outline_obj,
+        cast_bible_text=cast_bible_text,
+        protagonist=protagonist,
+        style_bible_text=style_bible_text,
+        writer_md=writer_md,
+        knowledge_pack=knowledge_pack,
+        forced_opening=forced_opening,
+        outline_index=outline_index,
+    )
+
+
+# =========================
+# Per-chapter steps
+# =========================
+def _stream_draft(writer: WriterAgent, part_path: Path, flush_every: int = 16, **kwargs: Any) -> str:
+    """
+    WriterAgent.write_stream, with the draft appended to part_path as it arrives
+    (flushed every flush_every deltas) so progress is visible before the call returns.
+    """
+    part_path.parent.mkdir(parents=True, exist_ok=True)
+    chunks = []
+    with part_path.open("w", encoding="utf-8") as f:
+        for i, delta in enumerate(writer.write_stream(**kwargs), 1):
+            chunks.append(delta)
+            f.write(delta)
+            if i % flush_every == 0:
+                f.flush()
+    return "".join(chunks)
+
+
+def generate_chapter(
+    ctx: ProjectContext,
+    writer: WriterAgent,
+    n: int,
+    max_rewrite: int,
+    stream: bool = False,
+    rewrite_fanout: int = 1,
+) -> Tuple[ChapterObj, str, str]:
+    """
+    Draft chapter n (plus protagonist-drift rewrites). Reads ch{n-1} memory from disk.
+    With stream=True every draft is streamed into chapters/chNN.md.part while it is
+    generated (save_chapter removes it).
+    With rewrite_fanout=K > 1 each rewrite attempt sends K drafts at spread temperatures
+    concurrently and keeps the first that passes the drift check. The drafts are streamed
+    and the losers' streams are closed once a winner is in, but everything they generated
+    up to then is billed: budget up to K× the tokens of a rewrite. Off (1) by default.
+    Returns (chapter, chapter_outline_str, chapter_text).
+    """
+    protagonist = ctx.protagonist
+    forced_opening = ctx.forced_opening
+
+    ch = _load_chapter_outline(ctx.outline_obj, n, ctx.outline_index)
+    chapter_outline_str = _compiled_text(
+        ctx.cache_dir / "outline",
+        f"ch{n:02d}.txt",
+        ctx.project_dir / "outline.yml",
+        lambda: _format_chapter_outline_for_prompt(ch),
+    )
+
+    # 记忆
+    prev_mem_path = ctx.memory_dir / f"ch{n-1:02d}.json" if n > 1 else None
+    prev_memory = _read_json(prev_mem_path) if prev_mem_path else {}
+    memory_str = _json_dumps(prev_memory) if prev_memory else ""
+
     # 组装最终 prompt：填满 writer.md 的 5 个占位符
     final_prompt = _render_writer_template(
-        writer_md,
-        style_bible=style_bible_text,
-        spec=spec_text,
+        ctx.writer_md,
+        style_bible=ctx.style_bible_text,
+        spec=ctx.spec_text,
         chapter_outline=chapter_outline_str,
         memory=memory_str,
-        knowledge=knowledge_pack + "\n\n【必须逐字使用的开头锚点】\n" + forced_opening + "\n",
+        knowledge=ctx.knowledge_pack + "\n\n【必须逐字使用的开头锚点】\n" + forced_opening + "\n",
     )
 
-    # provider + writer
-    provider = get_ai_provider()
-    writer = WriterAgent(provider, templates_dir)
-
     chapter_payload = {
         "number": ch.number,
         "title": ch.title,
@@ -350,23 +673,40 @@ def main() -> None:
         "protagonist": protagonist,
     }
 
+    part_path = _part_path(ctx, n)
+
+    def _draft(writing_prompt: str, temperature: float = 0.8, stream: bool = stream) -> str:
+        kw = dict(spec=ctx.spec_for_writer, chapter=chapter_payload, writing_prompt=writing_prompt, temperature=temperature)
+        text = _stream_draft(writer, part_path, **kw) if stream else writer.write(**kw)
+        # 开头锚点强制前置（即便模型写对也不影响，只会更稳）
+        return _enforce_opening(text, forced_opening, protagonist)
+
+    def _draft_until(writing_prompt: str, temperature: float, stop: threading.Event) -> str:
+        # fan-out leg: streamed (not to .part) so it can be aborted once another leg has won
+        kw = dict(spec=ctx.spec_for_writer, chapter=chapter_payload, writing_prompt=writing_prompt, temperature=temperature)
+        chunks = []
+        deltas = writer.write_stream(**kw)
+        try:
+            for delta in deltas:
+                if stop.is_set():
+                    return ""
+                chunks.append(delta)
+        finally:
+            deltas.close()  # closes the provider stream, i.e. the HTTP response
+        return _enforce_opening("".join(chunks), forced_opening, protagonist)
+
     # 第一次生成
-    chapter_text = writer.write(
-        spec=spec_obj if isinstance(spec_obj, dict) else {"spec": spec_obj},
-        chapter=chapter_payload,
-        writing_prompt=final_prompt,
-    )
+    chapter_text = _draft(final_prompt)
 
-    # 开头锚点强制前置（即便模型写对也不影响，只会更稳）
-    chapter_text = _enforce_opening(chapter_text, forced_opening, protagonist)
+    k = max(1, int(rewrite_fanout))
+    temperatures = [0.8] if k == 1 else [0.6 + 0.3 * i / (k - 1) for i in range(k)]
 
     # 纠偏重写循环：拿“错误正文”回灌让它纠偏（不是自由再写）
-    for attempt in range(1, int(args.max_rewrite) + 1):
-        drift = (not _protagonist_ok(chapter_text, protagonist)) or _contains_banned_name(chapter_text, protagonist)
-        if not drift:
+    for attempt in range(1, int(max_rewrite) + 1):
+        if not _drifted(chapter_text, protagonist):
             break
 
-        print(f"[WARN] protagonist drift detected. Rewrite attempt {attempt}/{args.max_rewrite}...")
+        print(f"[WARN] ch{n:02d} protagonist drift detected. Rewrite attempt {attempt}/{max_rewrite}...")
 
         fix_instruction = (
             "\n\n### 强制纠偏重写（必须执行）\n"
@@ -385,24 +725,140 @@ def main() -> None:
             "-----\n"
         )
 
-        chapter_text = writer.write(
-            spec=spec_obj if isinstance(spec_obj, dict) else {"spec": spec_obj},
-            chapter=chapter_payload,
-            writing_prompt=final_prompt + fix_instruction,
-        )
-        chapter_text = _enforce_opening(chapter_text, forced_opening, protagonist)
+        if k == 1:
+            chapter_text = _draft(final_prompt + fix_instruction)
+        else:
+            # 多路并发重写（不写 .part，避免多路写同一个文件），取第一个通过漂移检查的，其余中断
+            chapter_text = _first_ok(
+                lambda t, stop: _draft_until(final_prompt + fix_instruction, t, stop),
+                temperatures,
+                lambda text: not _drifted(text, protagonist),
+            )
 
-    # 保存章节
-    chapter_out = project_dir / "chapters" / f"ch{args.chapter:02d}.md"
+    return ch, chapter_outline_str, chapter_text
+
+
+def _part_path(ctx: ProjectContext, n: int) -> Path:
+    return ctx.project_dir / "chapters" / f"ch{n:02d}.md.part"
+
+
+def save_chapter(ctx: ProjectContext, ch: ChapterObj, chapter_text: str) -> Path:
+    chapter_out = ctx.project_dir / "chapters" / f"ch{ch.number:02d}.md"
     _write_text(chapter_out, f"# {ch.title}\n\n{(chapter_text or '').strip()}\n")
+    _part_path(ctx, ch.number).unlink(missing_ok=True)
     print(f"[OK] chapter  -> {chapter_out}")
+    return chapter_out
+
 
-    # 保存记忆
-    mem = _build_memory(provider, chapter_text)
-    memory_dir.mkdir(parents=True, exist_ok=True)
-    mem_path = memory_dir / f"ch{args.chapter:02d}.json"
-    _write_text(mem_path, json.dumps(mem, ensure_ascii=False, indent=2))
+def save_memory(ctx: ProjectContext, n: int, mem: Dict[str, Any]) -> Path:
+    mem_path = ctx.memory_dir / f"ch{n:02d}.json"
+    _write_text(mem_path, _json_dumps(mem))
     print(f"[OK] memory   -> {mem_path}")
+    return mem_path
+
+
+def save_review(ctx: ProjectContext, n: int, review: str) -> Path:
+    review_out = ctx.project_dir / "reviews" / f"ch{n:02d}.md"
+    _write_text(review_out, review.strip() + "\n")
+    print(f"[OK] review   -> {review_out}")
+    return review_out
+
+
+def finish_chapter(ctx: ProjectContext, provider, n: int, chapter_outline_str: str, chapter_text: str, review: bool = False) -> Dict[str, Any]:
+    """
+    Memory build (+ optional editor review) for a finished draft; saves both and returns the memory.
+    """
+    # 记忆 + 编辑审阅：都只依赖定稿正文，彼此独立，所以并发发出
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        mem_f = ex.submit(_build_memory, provider, chapter_text)
+        review_f = None
+        if review:
+            editor = EditorAgent(provider, ctx.templates_dir)
+            review_f = ex.submit(editor.review, ctx.spec_text, chapter_outline_str, chapter_text)
+        mem = mem_f.result()
+        review_text = review_f.result() if review_f is not None else None
+
+    if review_text is not None:
+        save_review(ctx, n, review_text)
+    save_memory(ctx, n, mem)
+    return mem
+
+
+def run_one_chapter(
+    ctx: ProjectContext,
+    provider,
+    writer: WriterAgent,
+    n: int,
+    max_rewrite: int = 3,
+    review: bool = False,
+    stream: bool = False,
+    rewrite_fanout: int = 1,
+) -> Path:
+    """
+    Draft, save, then build memory (+ optional review) for chapter n. Returns the chapter path.
+    Shared by run_chapter, run_chapters (sequential mode) and chapter_worker.
+    """
+    ch, chapter_outline_str, chapter_text = generate_chapter(
+        ctx, writer, n, max_rewrite, stream=stream, rewrite_fanout=rewrite_fanout
+    )
+    # 保存章节
+    path = save_chapter(ctx, ch, chapter_text)
+    # 保存记忆（+ 审阅）
+    finish_chapter(ctx, provider, n, chapter_outline_str, chapter_text, review=review)
+    return path
+
+
+# =========================
+# Main
+# =========================
+def add_cache_args(ap: argparse.ArgumentParser) -> None:
+    g = ap.add_mutually_exclusive_group()
+    g.add_argument("--cache", action="store_true", help="Cache every LLM call on disk, so re-runs with unchanged prompts replay instantly")
+    g.add_argument("--no_cache", action="store_true", help="Disable the LLM response cache even if WRITEBOOK_LLM_CACHE is set")
+
+
+def apply_cache_args(args: argparse.Namespace) -> None:
+    # the provider reads WRITEBOOK_LLM_CACHE on every call (see openai_provider)
+    if args.cache:
+        os.environ["WRITEBOOK_LLM_CACHE"] = "all"
+    elif args.no_cache:
+        os.environ.pop("WRITEBOOK_LLM_CACHE", None)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--project", required=True, help="e.g. data/projects/book_001")
+    ap.add_argument("--chapter", required=True, type=int)
+    ap.add_argument("--templates_dir", default="backend/ai/prompts/templates")
+    ap.add_argument("--style_bible", required=True, help="e.g. data/knowledge/style_profiles/style_bible.json")
+    ap.add_argument("--knowledge_dir", default="data/knowledge")
+
+    ap.add_argument("--max_rewrite", type=int, default=3)
+    ap.add_argument("--review", action="store_true", help="Also run an editor review (concurrently with the memory build)")
+    ap.add_argument("--stream", action="store_true", help="Stream the draft into chapters/chNN.md.part while it is generated")
+    ap.add_argument("--rewrite_fanout", type=int, default=1, help="Concurrent drafts per drift rewrite attempt; first passing one wins, the rest are aborted (costs up to N× rewrite tokens)")
+    add_cache_args(ap)
+    args = ap.parse_args()
+    apply_cache_args(args)
+
+    ctx = load_project_context(
+        Path(args.project), Path(args.templates_dir), Path(args.style_bible), Path(args.knowledge_dir)
+    )
+
+    # provider + writer
+    provider = get_ai_provider()
+    writer = WriterAgent(provider, ctx.templates_dir)
+
+    run_one_chapter(
+        ctx,
+        provider,
+        writer,
+        args.chapter,
+        args.max_rewrite,
+        review=args.review,
+        stream=args.stream,
+        rewrite_fanout=args.rewrite_fanout,
+    )
 
 
 if __name__ == "__main__":
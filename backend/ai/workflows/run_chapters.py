@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Generate a range of chapters in one process.
+
+Project files, templates, style bible and the provider are loaded once and
+shared by every chapter.
+
+- default: chapters run as a chain (chapter N reads chapter N-1's memory),
+  so each chapter waits for the previous one's memory;
+- --parallel: the outline is treated as the only dependency; all drafts are
+  submitted together (bounded by --max_concurrency), then all memories.
+
+Usage:
+  python -m backend.ai.workflows.run_chapters \
+    --project data/projects/book_001 \
+    --chapters 1-20 \
+    --style_bible data/knowledge/style_profiles/style_bible.json
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import List, Tuple
+
+from backend.ai.agents.batch import run_batch
+from backend.ai.agents.writer import WriterAgent
+from backend.ai.provider import get_ai_provider
+from backend.ai.workflows.run_chapter import (
+    add_cache_args,
+    apply_cache_args,
+    finish_chapter,
+    generate_chapter,
+    load_project_context,
+    run_one_chapter,
+    save_chapter,
+)
+
+
+def parse_chapters(spec: str) -> List[int]:
+    """
+    "1-3,7,9-10" -> [1, 2, 3, 7, 9, 10] (sorted, deduplicated)
+    """
+    out = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            a, b = part.split("-", 1)
+            lo, hi = int(a), int(b)
+            if lo > hi:
+                lo, hi = hi, lo
+            out.update(range(lo, hi + 1))
+        else:
+            out.add(int(part))
+    if not out:
+        raise ValueError(f"No chapters in {spec!r}")
+    return sorted(out)
+
+
+def _draft_and_save(ctx, writer: WriterAgent, n: int, max_rewrite: int, stream: bool, rewrite_fanout: int) -> Tuple[int, str, str]:
+    # saved as soon as its own draft is done: a failing sibling chapter can't discard it
+    ch, outline_str, text = generate_chapter(ctx, writer, n, max_rewrite, stream, rewrite_fanout)
+    save_chapter(ctx, ch, text)
+    return ch.number, outline_str, text
+
+
+def run_parallel(
+    ctx,
+    provider,
+    writer: WriterAgent,
+    chapters: List[int],
+    max_rewrite: int = 3,
+    review: bool = False,
+    max_concurrency: int = 4,
+    stream: bool = False,
+    rewrite_fanout: int = 1,
+) -> List[int]:
+    """
+    --parallel mode. Returns the chapter numbers that failed (draft or memory);
+    every other chapter is saved even when some fail.
+    """
+    failed: List[int] = []
+
+    # wave 1: every draft (each reads whatever memory already exists on disk)
+    drafts = run_batch(
+        _draft_and_save,
+        [(ctx, writer, n, max_rewrite, stream, rewrite_fanout) for n in chapters],
+        max_concurrency=max_concurrency,
+        return_exceptions=True,
+    )
+    done = []
+    for n, res in zip(chapters, drafts):
+        if isinstance(res, BaseException):
+            print(f"[ERR] ch{n:02d} draft: {type(res).__name__}: {res}")
+            failed.append(n)
+        else:
+            done.append(res)
+
+    # wave 2: memories (+ reviews) for every saved draft
+    finished = run_batch(
+        finish_chapter,
+        [(ctx, provider, n, outline_str, text, review) for n, outline_str, text in done],
+        max_concurrency=max_concurrency,
+        return_exceptions=True,
+    )
+    for (n, _, _), res in zip(done, finished):
+        if isinstance(res, BaseException):
+            print(f"[ERR] ch{n:02d} memory: {type(res).__name__}: {res}")
+            failed.append(n)
+    return sorted(failed)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--project", required=True, help="e.g. data/projects/book_001")
+    ap.add_argument("--chapters", required=True, help='e.g. "1-20" or "1,3,5-7"')
+    ap.add_argument("--templates_dir", default="backend/ai/prompts/templates")
+    ap.add_argument("--style_bible", required=True, help="e.g. data/knowledge/style_profiles/style_bible.json")
+    ap.add_argument("--knowledge_dir", default="data/knowledge")
+    ap.add_argument("--max_rewrite", type=int, default=3)
+    ap.add_argument("--review", action="store_true", help="Also run an editor review per chapter")
+    ap.add_argument("--parallel", action="store_true", help="Draft all chapters concurrently (no memory chaining inside the range)")
+    ap.add_argument("--max_concurrency", type=int, default=4)
+    ap.add_argument("--stream", action="store_true", help="Stream each draft into chapters/chNN.md.part while it is generated")
+    ap.add_argument("--rewrite_fanout", type=int, default=1, help="Concurrent drafts per drift rewrite attempt; first passing one wins, the rest are aborted (costs up to N× rewrite tokens)")
+    add_cache_args(ap)
+    args = ap.parse_args()
+    apply_cache_args(args)
+
+    chapters = parse_chapters(args.chapters)
+    ctx = load_project_context(
+        Path(args.project), Path(args.templates_dir), Path(args.style_bible), Path(args.knowledge_dir)
+    )
+    provider = get_ai_provider()
+    writer = WriterAgent(provider, ctx.templates_dir)
+
+    if not args.parallel:
+        for n in chapters:
+            run_one_chapter(
+                ctx,
+                provider,
+                writer,
+                n,
+                args.max_rewrite,
+                review=args.review,
+                stream=args.stream,
+                rewrite_fanout=args.rewrite_fanout,
+            )
+        return
+
+    failed = run_parallel(
+        ctx,
+        provider,
+        writer,
+        chapters,
+        args.max_rewrite,
+        review=args.review,
+        max_concurrency=args.max_concurrency,
+        stream=args.stream,
+        rewrite_fanout=args.rewrite_fanout,
+    )
+    if failed:
+        print(f"[ERR] failed chapters: {', '.join(str(n) for n in failed)}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
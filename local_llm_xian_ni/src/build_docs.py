@@ -25,13 +25,27 @@ DEFAULT_WRITE_PROMPT = """你是小说学习笔记作者。你将基于结构化
 注意：不要杜撰，只能基于给定数据。
 """
 
-SYSTEM = "You write study notes from structured character-relation graphs."
+SYSTEM = (
+    "You write study notes from structured character-relation graphs.\n"
+    "字段说明：relations[].evidence 为证据片段（chunk_id, quote, span）。只可基于这些信息写作。"
+)
 
 
 def _load_yaml(p: Path) -> Any:
     return yaml.safe_load(p.read_text(encoding="utf-8"))
 
 
+def _build_timeline(relations_sorted: List[Dict[str, Any]]) -> List[str]:
+    # timeline (cheap heuristic)
+    timeline_lines = ["# 关系演化时间线（粗略）", ""]
+    for r in relations_sorted:
+        a, b, t = r.get("from"), r.get("to"), r.get("type")
+        status = r.get("status", "")
+        first = r.get("first_seen_chunk", "")
+        timeline_lines.append(f"- {a} — {t} → {b}（{status}；首次片段 {first}）")
+    return timeline_lines
+
+
 def main() -> None:
     ap = argparse.ArgumentParser()
     ap.add_argument("--out_dir", required=True, help="out/")
@@ -62,24 +76,19 @@ def main() -> None:
     payload = {
         "characters": characters_compact,
         "relations": relations_compact,
-        "note": "字段说明：relations[].evidence 为证据片段（chunk_id, quote, span）。只可基于这些信息写作。",
     }
 
+    # the timeline needs no LLM: write it first so it exists even if the LLM call fails
+    timeline_lines = _build_timeline(relations_sorted[:120])
+    (out_dir / "timeline.md").write_text("\n".join(timeline_lines) + "\n", encoding="utf-8")
+
     llm = OpenAILLM()
-    user = user_prompt + "\n\n=== DATA(JSON) ===\n" + json.dumps(payload, ensure_ascii=False, indent=2)
+    # minified: indentation is pure prompt-token overhead on hundreds of records
+    user = user_prompt + "\n\n=== DATA(JSON) ===\n" + json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
 
     md = llm.respond_text(system=SYSTEM, user=user)
 
-    # timeline (cheap heuristic)
-    timeline_lines = ["# 关系演化时间线（粗略）", ""]
-    for r in relations_sorted[:120]:
-        a, b, t = r.get("from"), r.get("to"), r.get("type")
-        status = r.get("status", "")
-        first = r.get("first_seen_chunk", "")
-        timeline_lines.append(f"- {a} — {t} → {b}（{status}；首次片段 {first}）")
-
     (out_dir / "study_notes.md").write_text(md.strip() + "\n", encoding="utf-8")
-    (out_dir / "timeline.md").write_text("\n".join(timeline_lines) + "\n", encoding="utf-8")
 
     print(f"[OK] study_notes -> {out_dir / 'study_notes.md'}")
     print(f"[OK] timeline    -> {out_dir / 'timeline.md'}")
@@ -7,7 +7,12 @@ import argparse
 import json
 import re
 from pathlib import Path
-from typing import List, Dict, Any, Tuple, Optional
+from typing import Any, Dict, Iterator, List, Tuple, Optional
+
+try:
+    import orjson  # optional: faster, emits utf-8 bytes directly
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
 
 
 # 兼容：第一卷 平庸少年、第二卷 XXX（如果你未来想按卷切）
@@ -66,18 +71,22 @@ def _find_chapter_spans(text: str) -> List[Tuple[str, int, int]]:
     return spans
 
 
-def _chunk_text(body: str, max_chars: int, overlap: int) -> List[Dict[str, Any]]:
-    body = body.strip()
-    if not body:
-        return []
-    chunks: List[Dict[str, Any]] = []
+def _jsonl_line(obj: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _chunk_spans(n: int, max_chars: int, overlap: int) -> Iterator[Tuple[int, int]]:
+    """
+    Yield (start, end) windows over a body of length n; the caller slices the text
+    only when it writes the row, so overlapping copies never pile up in memory.
+    """
     step = max(1, max_chars - overlap)
     i = 0
-    while i < len(body):
-        j = min(len(body), i + max_chars)
-        chunks.append({"start_char": i, "end_char": j, "text": body[i:j]})
+    while i < n:
+        yield i, min(n, i + max_chars)
         i += step
-    return chunks
 
 
 def main() -> None:
@@ -124,41 +133,38 @@ def main() -> None:
     if args.max_chapters and args.max_chapters > 0:
         chapter_spans = chapter_spans[: args.max_chapters]
 
-    # 3) 章内切 chunk 并写 jsonl
-    out_lines: List[Dict[str, Any]] = []
+    # 3) 章内切 chunk，边切边写 jsonl
     chunk_id = 0
 
-    for ci, (ch_title, s, e) in enumerate(chapter_spans, start=1):
-        body = text[s:e].strip()
-        chunks = _chunk_text(body, max_chars=args.max_chars, overlap=args.overlap)
+    with dst.open("wb") as f:
+        for ci, (ch_title, s, e) in enumerate(chapter_spans, start=1):
+            body = text[s:e].strip()
+            rows: List[bytes] = []
 
-        for k, c in enumerate(chunks, start=1):
-            out_lines.append(
-                {
+            for k, (i, j) in enumerate(_chunk_spans(len(body), args.max_chars, args.overlap), start=1):
+                obj = {
                     "chunk_id": f"{chunk_id:06d}",
                     "volume": args.volume if args.volume else None,
                     "volume_title": volume_title if volume_title else None,
                     "chapter_index": ci,
                     "chapter_title": ch_title,
                     "part_index": k,
-                    "start_char": c["start_char"],
-                    "end_char": c["end_char"],
-                    "text": c["text"],
+                    "start_char": i,
+                    "end_char": j,
+                    "text": body[i:j],
                 }
-            )
-            chunk_id += 1
+                rows.append(_jsonl_line(obj))
+                chunk_id += 1
 
-            if args.max_chunks and len(out_lines) >= args.max_chunks:
-                break
+                if args.max_chunks and chunk_id >= args.max_chunks:
+                    break
 
-        if args.max_chunks and len(out_lines) >= args.max_chunks:
-            break
+            f.writelines(rows)  # one buffered write per chapter
 
-    with dst.open("w", encoding="utf-8") as f:
-        for obj in out_lines:
-            f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+            if args.max_chunks and chunk_id >= args.max_chunks:
+                break
 
-    print(f"[OK] wrote {len(out_lines)} chunks -> {dst}")
+    print(f"[OK] wrote {chunk_id} chunks -> {dst}")
     print(f"[OK] chapters used: {len(chapter_spans)} (max_chapters={args.max_chapters or 'all'})")
 
 
@@ -4,13 +4,25 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
+import hashlib
 import json
+import re
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Any, List, Set
+from typing import Dict, Any, Iterator, List, Set, Tuple
 
 from tqdm import tqdm
 
-from .llm_client import OpenAILLM
+try:
+    import orjson  # optional: faster, emits utf-8 bytes directly
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+from .llm_client import OpenAILLM, cache_enabled_from_env
+
+# 最近这么多个不同的 chunk 正文记住其抽取任务；正文相同（重复的作者前言、章末附言等）的 chunk 复用结果，不再调用 LLM
+DEDUP_RECENT = 1024
 
 
 DEFAULT_PROMPT = """你是中文长篇小说信息抽取专家。
@@ -43,27 +55,56 @@ JSON schema:
 SYSTEM = "You extract structured knowledge from Chinese novel text. Output JSON only."
 
 
-def _read_jsonl(p: Path) -> List[Dict[str, Any]]:
+def _json_loads(s: bytes) -> Any:
+    return orjson.loads(s) if orjson is not None else json.loads(s)
+
+
+def _jsonl_line(obj: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _iter_jsonl(p: Path) -> Iterator[Dict[str, Any]]:
+    """
+    Yield one parsed row per non-empty line; rows are never all held in memory.
+    """
     if not p.exists():
-        raise RuntimeError(f"Missing: {p}")
-    rows = []
-    with p.open("r", encoding="utf-8") as f:
+        raise RuntimeError(f"Missing: {p}")  # checked eagerly, not on first next()
+    return _iter_lines(p)
+
+
+def _iter_lines(p: Path) -> Iterator[Dict[str, Any]]:
+    with p.open("rb") as f:
         for line in f:
             line = line.strip()
             if not line:
                 continue
-            rows.append(json.loads(line))
-    return rows
+            yield _json_loads(line)
+
+
+# 本工具写出的完整行："chunk_id" 是第一个键，且以 "}\n" 结尾，只需取出 id，不必整行解析。
+# 中断留下的半行会和续跑写入的下一行拼在一起（出现两个 {"chunk_id"），这种行走完整解析（失败即跳过，会重跑）
+DONE_LINE_RE = re.compile(rb'^\{"chunk_id": ?"([^"\\]+)".*\}\r?\n\Z', re.S)
+
+
+def _count_rows(p: Path) -> int:
+    with p.open("rb") as f:
+        return sum(1 for line in f if line.strip())
 
 
 def _existing_chunk_ids(out_path: Path) -> Set[str]:
     if not out_path.exists():
         return set()
     s: Set[str] = set()
-    with out_path.open("r", encoding="utf-8") as f:
+    with out_path.open("rb") as f:
         for line in f:
+            m = DONE_LINE_RE.match(line)
+            if m and line.find(b'{"chunk_id"', 1) == -1:
+                s.add(m.group(1).decode("utf-8"))
+                continue
             try:
-                obj = json.loads(line)
+                obj = _json_loads(line)
                 cid = obj.get("chunk_id")
                 if cid:
                     s.add(str(cid))
@@ -77,7 +118,12 @@ def main() -> None:
     ap.add_argument("--chunks", required=True, help="out/chunks.jsonl")
     ap.add_argument("--out", required=True, help="out/extractions.jsonl")
     ap.add_argument("--prompt", default="prompts/extract_chunk.md")
-    ap.add_argument("--workers", type=int, default=1, help="keep 1 for safety; you can parallelize later")
+    ap.add_argument("--workers", type=int, default=1, help="concurrent LLM calls (bounded by your API rate limit)")
+    ap.add_argument(
+        "--cache",
+        action="store_true",
+        help="replay identical requests from <out dir>/.llm_cache instead of re-sampling (also: LLM_CACHE=1)",
+    )
     args = ap.parse_args()
 
     chunks_path = Path(args.chunks)
@@ -87,44 +133,106 @@ def main() -> None:
     prompt_path = Path(args.prompt)
     user_prompt = prompt_path.read_text(encoding="utf-8").strip() if prompt_path.exists() else DEFAULT_PROMPT
 
-    rows = _read_jsonl(chunks_path)
+    rows = _iter_jsonl(chunks_path)
     done = _existing_chunk_ids(out_path)
 
-    llm = OpenAILLM()
-
-    with out_path.open("a", encoding="utf-8") as fout:
-        for r in tqdm(rows, desc="extract"):
-            cid = str(r["chunk_id"])
-            if cid in done:
-                continue
-
-            text = r["text"]
-            user = (
-                user_prompt
-                + "\n\n"
-                + "=== META ===\n"
-                + f"chunk_id: {cid}\n"
-                + f"chapter: {r.get('chapter_title','')}\n"
-                + f"part: {r.get('part_index','')}\n"
-                + "=== TEXT ===\n"
-                + text
-            )
-
-            obj = llm.respond_json(system=SYSTEM, user=user)
-
-            # attach meta
-            out_obj = {
-                "chunk_id": cid,
-                "chapter_index": r.get("chapter_index"),
-                "chapter_title": r.get("chapter_title"),
-                "part_index": r.get("part_index"),
-                "start_char": r.get("start_char"),
-                "end_char": r.get("end_char"),
-                "extraction": obj,
-            }
-
-            fout.write(json.dumps(out_obj, ensure_ascii=False) + "\n")
-            fout.flush()
+    workers = max(1, args.workers)
+    cache_dir = out_path.parent / ".llm_cache" if (args.cache or cache_enabled_from_env()) else None
+    llm = OpenAILLM(max_connections=workers, cache_dir=cache_dir)
+
+    pending = (r for r in rows if str(r["chunk_id"]) not in done)
+    # progress total without parsing the chunks twice (ids already done may not all be in this file)
+    total = max(0, _count_rows(chunks_path) - len(done))
+
+    def _build_user(r: Dict[str, Any]) -> str:
+        # one f-string: a single BUILD_STRING instead of a chain of intermediate copies
+        return (
+            f"{user_prompt}\n\n"
+            "=== META ===\n"
+            f"chunk_id: {r['chunk_id']}\n"
+            f"chapter: {r.get('chapter_title','')}\n"
+            f"part: {r.get('part_index','')}\n"
+            "=== TEXT ===\n"
+            f"{r['text']}"
+        )
+
+    def _out_line(r: Dict[str, Any], obj: Dict[str, Any]) -> bytes:
+        # attach meta
+        out_obj = {
+            "chunk_id": str(r["chunk_id"]),
+            "chapter_index": r.get("chapter_index"),
+            "chapter_title": r.get("chapter_title"),
+            "part_index": r.get("part_index"),
+            "start_char": r.get("start_char"),
+            "end_char": r.get("end_char"),
+            "extraction": obj,
+        }
+        return _jsonl_line(out_obj)
+
+    # 调用是网络等待为主，asyncio 并发（同时在途的请求最多 workers 个）；结果按 chunk 原顺序写出
+    # （merge 依赖顺序：别名先到先得、first_seen_chunk）
+    # 每行写完即 flush，中断后重跑会跳过已写出的 chunk
+    # chunks 边读边提交：已提交未写出的最多 window 个，内存与语料大小无关
+    # 正文相同的 chunk 共用一次调用（最近 DEDUP_RECENT 个不同正文内），结果照常按各自的 meta 写出
+    window = workers * 4
+
+    async def _run() -> None:
+        sem = asyncio.Semaphore(workers)
+
+        async def _one(r: Dict[str, Any]) -> Dict[str, Any]:
+            async with sem:
+                return await llm.arespond_json(system=SYSTEM, user=_build_user(r))
+
+        inflight: Dict[Any, List[Tuple[int, Dict[str, Any]]]] = {}  # task -> [(seq, row), ...]
+        by_text: "OrderedDict[bytes, Any]" = OrderedDict()  # sha1(text) -> task
+        ready: Dict[int, bytes] = {}
+        submitted = next_i = 0
+        exhausted = False
+        pbar = tqdm(desc="extract", unit="chunk", total=total)
+        try:
+            with out_path.open("ab") as fout:
+                while True:
+                    while not exhausted and submitted - next_i < window:
+                        r = next(pending, None)
+                        if r is None:
+                            exhausted = True
+                            break
+                        key = hashlib.sha1(str(r["text"]).encode("utf-8")).digest()
+                        task = by_text.get(key)
+                        if task is None:
+                            task = by_text[key] = asyncio.create_task(_one(r))
+                            if len(by_text) > DEDUP_RECENT:
+                                by_text.popitem(last=False)
+                        else:
+                            by_text.move_to_end(key)
+                        if task.done():
+                            ready[submitted] = _out_line(r, task.result())
+                        else:
+                            inflight.setdefault(task, []).append((submitted, r))
+                        submitted += 1
+                    while next_i in ready:
+                        fout.write(ready.pop(next_i))
+                        fout.flush()
+                        next_i += 1
+                        pbar.update(1)
+                    if not inflight:
+                        if exhausted:
+                            break
+                        continue
+                    finished, _ = await asyncio.wait(inflight, return_when=asyncio.FIRST_COMPLETED)
+                    for task in finished:
+                        # a failure propagates; the calls still in flight are cancelled below
+                        obj = task.result()
+                        for i, r in inflight.pop(task):
+                            ready[i] = _out_line(r, obj)
+        finally:
+            pbar.close()
+            for task in inflight:
+                task.cancel()
+            await asyncio.gather(*inflight, return_exceptions=True)
+            await llm.aclose()
+
+    asyncio.run(_run())
 
     print(f"[OK] extractions -> {out_path}")
 
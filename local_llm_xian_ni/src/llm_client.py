@@ -6,10 +6,66 @@ from __future__ import annotations
 import os
 import json
 import time
+import asyncio
+import hashlib
+import functools
+import threading
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
 
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+
+def _pool_kwargs(max_connections: int) -> Dict[str, Any]:
+    # HTTP/2 is used when the optional `h2` package is installed
+    try:
+        import h2  # noqa: F401
+        http2 = True
+    except ImportError:
+        http2 = False
+    return {
+        "http2": http2,
+        "limits": httpx.Limits(max_keepalive_connections=max_connections, max_connections=max_connections * 2),
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def _shared_client(max_connections: int) -> OpenAI:
+    """
+    One OpenAI client per pool size, shared by every OpenAILLM (and every worker
+    thread), so concurrent calls reuse keep-alive connections instead of paying a
+    TLS handshake each.
+    """
+    return OpenAI(http_client=httpx.Client(**_pool_kwargs(max_connections)))
+
+
+_JSON_DECODER = json.JSONDecoder()
+
+
+# 抽取结果磁盘缓存（可选，默认关闭）：同一 (model, temperature, max_output_tokens, system, user) 直接复用
+# 上次解析好的 JSON，改 prompt 后重跑只付改动部分的钱。注意：开启后重跑不会重新采样。
+def cache_enabled_from_env() -> bool:
+    return os.getenv("LLM_CACHE", "").strip().lower() in ("1", "true", "yes")
+
+
+def _cache_get(d: Path, key: str) -> Optional[Dict[str, Any]]:
+    try:
+        with (d / f"{key}.json").open("rb") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _cache_put(d: Path, key: str, obj: Dict[str, Any]) -> None:
+    try:
+        d.mkdir(parents=True, exist_ok=True)
+        tmp = d / f"{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+        tmp.write_text(json.dumps(obj, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, d / f"{key}.json")  # atomic: other threads/runs never see a half-written entry
+    except OSError:
+        pass  # cache is best-effort
 
 
 @dataclass
@@ -30,10 +86,69 @@ class OpenAILLM:
       - Quickstart :contentReference[oaicite:2]{index=2}
     """
 
-    def __init__(self, config: Optional[LLMConfig] = None) -> None:
+    def __init__(self, config: Optional[LLMConfig] = None, max_connections: int = 8, cache_dir: Optional[Path] = None) -> None:
+        """
+        max_connections: keep-alive pool size; pass the number of threads calling this client.
+        cache_dir: enables the respond_json disk cache there (None = every call goes to the API).
+        """
         model = os.getenv("OPENAI_MODEL", "gpt-5.2")
         self.cfg = config or LLMConfig(model=model)
-        self.client = OpenAI()
+        self.max_connections = max(1, max_connections)
+        self.cache_dir = cache_dir
+        self.client = _shared_client(self.max_connections)
+        self._aclient: Optional[AsyncOpenAI] = None
+        self._aloop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def aclient(self) -> AsyncOpenAI:
+        # an async connection pool is bound to the loop that created it;
+        # rebuild it when reused from a new asyncio.run()
+        loop = asyncio.get_running_loop()
+        if self._aclient is None or self._aloop is not loop:
+            old, old_loop = self._aclient, self._aloop
+            if old is not None and old_loop is not None and old_loop.is_running():
+                # still alive on another thread: close its pool there
+                asyncio.run_coroutine_threadsafe(old.close(), old_loop)
+            # otherwise its loop is gone and the pool cannot be awaited any more; drop it
+            self._aclient = AsyncOpenAI(http_client=httpx.AsyncClient(**_pool_kwargs(self.max_connections)))
+            self._aloop = loop
+        return self._aclient
+
+    async def aclose(self) -> None:
+        """
+        Close the async connection pool; call before the event loop that used it ends.
+        """
+        if self._aclient is not None:
+            client, self._aclient, self._aloop = self._aclient, None, None
+            await client.close()
+
+    def _request(self, system: str, user: str) -> Dict[str, Any]:
+        return {
+            "model": self.cfg.model,
+            "input": [
+                {"role": "system", "content": system},
+                {"role": "user", "content": user},
+            ],
+            "temperature": self.cfg.temperature,
+            "max_output_tokens": self.cfg.max_output_tokens,
+        }
+
+    @staticmethod
+    def _output_text(resp: Any) -> str:
+        # Python SDK exposes output_text as convenience in docs :contentReference[oaicite:3]{index=3}
+        out = getattr(resp, "output_text", None)
+        if out is None:
+            # fallback: best-effort stringify
+            out = str(resp)
+        return str(out)
+
+    def _cache_slot(self, system: str, user: str) -> Optional[Tuple[Path, str]]:
+        if self.cache_dir is None:
+            return None
+        payload = json.dumps(
+            [self.cfg.model, self.cfg.temperature, self.cfg.max_output_tokens, system, user], ensure_ascii=False
+        )
+        return self.cache_dir, hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
     def _safe_json(self, text: str) -> Dict[str, Any]:
         """
@@ -52,13 +167,11 @@ class OpenAILLM:
         except Exception:
             pass
 
-        # extract first {...}
+        # decode the object that starts at the first "{"; trailing prose after it is ignored
         start = text.find("{")
-        end = text.rfind("}")
-        if 0 <= start < end:
-            cand = text[start : end + 1]
+        if 0 <= start < text.rfind("}"):
             try:
-                obj = json.loads(cand)
+                obj, _ = _JSON_DECODER.raw_decode(text, start)
                 return obj if isinstance(obj, dict) else {"_raw": obj}
             except Exception:
                 return {"_error": "invalid_json", "_text": text[:2000]}
@@ -72,29 +185,50 @@ class OpenAILLM:
         last_err: Optional[Exception] = None
         for i in range(self.cfg.retries):
             try:
-                resp = self.client.responses.create(
-                    model=self.cfg.model,
-                    input=[
-                        {"role": "system", "content": system},
-                        {"role": "user", "content": user},
-                    ],
-                    temperature=self.cfg.temperature,
-                    max_output_tokens=self.cfg.max_output_tokens,
-                )
-                # Python SDK exposes output_text as convenience in docs :contentReference[oaicite:3]{index=3}
-                out = getattr(resp, "output_text", None)
-                if out is None:
-                    # fallback: best-effort stringify
-                    out = str(resp)
-                return str(out)
+                return self._output_text(self.client.responses.create(**self._request(system, user)))
             except Exception as e:
                 last_err = e
                 time.sleep(self.cfg.backoff_base_s * (2**i))
         raise RuntimeError(f"OpenAI call failed after retries: {last_err}")
 
+    async def arespond_text(self, *, system: str, user: str) -> str:
+        """
+        asyncio flavour of respond_text: awaits the call (and the backoff) instead of blocking a thread.
+        """
+        last_err: Optional[Exception] = None
+        for i in range(self.cfg.retries):
+            try:
+                return self._output_text(await self.aclient.responses.create(**self._request(system, user)))
+            except Exception as e:
+                last_err = e
+                await asyncio.sleep(self.cfg.backoff_base_s * (2**i))
+        raise RuntimeError(f"OpenAI call failed after retries: {last_err}")
+
     def respond_json(self, *, system: str, user: str) -> Dict[str, Any]:
         """
         Asks model to output JSON only; then parses it robustly.
         """
-        txt = self.respond_text(system=system, user=user)
-        return self._safe_json(txt)
+        slot = self._cache_slot(system, user)
+        if slot is None:
+            return self._safe_json(self.respond_text(system=system, user=user))
+        hit = _cache_get(*slot)
+        if hit is not None:
+            return hit
+        obj = self._safe_json(self.respond_text(system=system, user=user))
+        if "_error" not in obj:  # unparseable replies are retried next run, not frozen
+            _cache_put(*slot, obj)
+        return obj
+
+    async def arespond_json(self, *, system: str, user: str) -> Dict[str, Any]:
+        """
+        asyncio flavour of respond_json; shares the on-disk cache with it.
+        """
+        slot = self._cache_slot(system, user)
+        # cache files are read/written in a worker thread, not on the event loop
+        hit = await asyncio.to_thread(_cache_get, *slot) if slot is not None else None
+        if hit is not None:
+            return hit
+        obj = self._safe_json(await self.arespond_text(system=system, user=user))
+        if slot is not None and "_error" not in obj:
+            await asyncio.to_thread(_cache_put, *slot, obj)
+        return obj
@@ -4,26 +4,51 @@
 from __future__ import annotations
 
 import argparse
+import functools
 import json
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterator, List, Tuple
 
 import yaml
 
+try:
+    import orjson  # optional: faster, emits utf-8 bytes directly
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
 
-def _read_jsonl(p: Path) -> List[Dict[str, Any]]:
+# libyaml's C emitter when PyYAML was built with it; same YAML, several times faster on big registries
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+def _json_loads(s: bytes) -> Any:
+    return orjson.loads(s) if orjson is not None else json.loads(s)
+
+
+def _jsonl_line(obj: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _iter_jsonl(p: Path) -> Iterator[Dict[str, Any]]:
+    """
+    Yield one parsed row per non-empty line; rows are never all held in memory.
+    """
     if not p.exists():
-        raise RuntimeError(f"Missing: {p}")
-    rows = []
-    with p.open("r", encoding="utf-8") as f:
+        raise RuntimeError(f"Missing: {p}")  # checked eagerly, not on first next()
+    return _iter_lines(p)
+
+
+def _iter_lines(p: Path) -> Iterator[Dict[str, Any]]:
+    with p.open("rb") as f:
         for line in f:
             line = line.strip()
             if not line:
                 continue
-            rows.append(json.loads(line))
-    return rows
+            yield _json_loads(line)
 
 
+@functools.lru_cache(maxsize=131072)  # names/types/statuses repeat across thousands of rows
 def _norm_name(s: str) -> str:
     s = (s or "").strip()
     # 去掉常见空白与括号内容
@@ -31,27 +56,51 @@ def _norm_name(s: str) -> str:
     return s
 
 
-def _merge_alias_map(entities: List[Dict[str, Any]]) -> Dict[str, str]:
+def _add_entity(amap: Dict[str, str], char_map: Dict[str, Dict[str, Any]], e: Dict[str, Any], chunk_id: Any) -> None:
     """
+    Register one extracted entity: alias resolution and character registry in one step.
+
     Very simple alias resolution:
     - canonical = entity.name
     - map aliases -> canonical
     - if alias appears multiple times, keep first (you can improve later)
+    amap entries are never overwritten, so the canonical name looked up here is already final.
     """
-    amap: Dict[str, str] = {}
-    for e in entities:
-        name = _norm_name(str(e.get("name", "")))
-        if not name:
-            continue
-        if name not in amap:
-            amap[name] = name
-        aliases = e.get("aliases") or []
-        if isinstance(aliases, list):
-            for a in aliases:
-                a = _norm_name(str(a))
-                if a and a not in amap:
-                    amap[a] = name
-    return amap
+    raw = _norm_name(str(e.get("name", "")))
+    if not raw:
+        return
+    if raw not in amap:
+        amap[raw] = raw
+    name = amap[raw]
+
+    obj = char_map.get(name)
+    if obj is None:
+        obj = {
+            "name": name,
+            "aliases": set(),
+            "notes": set(),
+            "type": e.get("type", "person"),
+            "evidence_refs": set(),
+        }
+        char_map[name] = obj
+    # aliases
+    aliases = e.get("aliases") or []
+    if isinstance(aliases, list):
+        for a in aliases:
+            a = _norm_name(str(a))
+            if not a:
+                continue
+            if a not in amap:
+                amap[a] = raw
+            if a != name:
+                obj["aliases"].add(a)
+    # notes
+    notes = e.get("notes")
+    if isinstance(notes, str) and notes.strip():
+        obj["notes"].add(notes.strip())
+    # evidence refs
+    if chunk_id:
+        obj["evidence_refs"].add(str(chunk_id))
 
 
 def _canon(amap: Dict[str, str], name: str) -> str:
@@ -69,10 +118,12 @@ def main() -> None:
     out_dir = Path(args.out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    rows = _read_jsonl(in_path)
+    rows = _iter_jsonl(in_path)
 
-    # collect raw entities + relations
-    all_entities: List[Dict[str, Any]] = []
+    # entities go straight into the alias map + character registry; relations need the
+    # final alias map, so they are collected (meta trimmed) and resolved afterwards
+    alias_map: Dict[str, str] = {}
+    char_map: Dict[str, Dict[str, Any]] = {}
     rel_rows: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
 
     for r in rows:
@@ -82,46 +133,13 @@ def main() -> None:
         if isinstance(ents, list):
             for e in ents:
                 if isinstance(e, dict):
-                    e2 = dict(e)
-                    e2["_chunk_id"] = r.get("chunk_id")
-                    all_entities.append(e2)
+                    _add_entity(alias_map, char_map, e, r.get("chunk_id"))
         if isinstance(rels, list):
+            # keep only the meta fields used below, not the whole extraction row
+            meta = {"chunk_id": r.get("chunk_id"), "chapter_title": r.get("chapter_title")}
             for rel in rels:
                 if isinstance(rel, dict):
-                    rel_rows.append((r, rel))
-
-    # build alias map (single-pass)
-    alias_map = _merge_alias_map(all_entities)
-
-    # build character registry
-    char_map: Dict[str, Dict[str, Any]] = {}
-    for e in all_entities:
-        name = _canon(alias_map, str(e.get("name", "")))
-        if not name:
-            continue
-        obj = char_map.get(name) or {
-            "name": name,
-            "aliases": set(),
-            "notes": set(),
-            "type": e.get("type", "person"),
-            "evidence_refs": set(),
-        }
-        # aliases
-        aliases = e.get("aliases") or []
-        if isinstance(aliases, list):
-            for a in aliases:
-                a = _norm_name(str(a))
-                if a and a != name:
-                    obj["aliases"].add(a)
-        # notes
-        notes = e.get("notes")
-        if isinstance(notes, str) and notes.strip():
-            obj["notes"].add(notes.strip())
-        # evidence refs
-        cid = e.get("_chunk_id")
-        if cid:
-            obj["evidence_refs"].add(str(cid))
-        char_map[name] = obj
+                    rel_rows.append((meta, rel))
 
     # normalize characters.yml
     characters = []
@@ -140,52 +158,51 @@ def main() -> None:
     rel_key_map: Dict[Tuple[str, str, str, str], Dict[str, Any]] = {}
 
     evidence_jsonl_path = out_dir / "evidence.jsonl"
-    ev_f = evidence_jsonl_path.open("w", encoding="utf-8")
-
-    for meta, rel in rel_rows:
-        a = _canon(alias_map, str(rel.get("from", "")))
-        b = _canon(alias_map, str(rel.get("to", "")))
-        t = _norm_name(str(rel.get("type", "其他")))
-        status = _norm_name(str(rel.get("status", "不确定")))
-        conf = rel.get("confidence", 0.5)
-        try:
-            conf = float(conf)
-        except Exception:
-            conf = 0.5
-
-        ev = rel.get("evidence") or {}
-        quote = _norm_name(str(ev.get("quote", "")))
-        st = ev.get("start_char")
-        ed = ev.get("end_char")
-
-        key = (a, b, t, status)
-        item = rel_key_map.get(key)
-        if item is None:
-            item = {
-                "from": a,
-                "to": b,
-                "type": t,
-                "status": status,
-                "confidence": conf,
-                "notes": _norm_name(str(rel.get("notes", ""))),
-                "first_seen_chunk": meta.get("chunk_id"),
-                "evidence": [],
-            }
-            rel_key_map[key] = item
-        else:
-            item["confidence"] = max(item["confidence"], conf)
-
-        if quote:
-            ev_obj = {
-                "chunk_id": meta.get("chunk_id"),
-                "chapter_title": meta.get("chapter_title"),
-                "quote": quote[:120],
-                "span": [st, ed],
-            }
-            item["evidence"].append(ev_obj)
-            ev_f.write(json.dumps({"key": list(key), **ev_obj}, ensure_ascii=False) + "\n")
 
-    ev_f.close()
+    # evidence 行按 relation 顺序边算边写（与 extractions 的 chunk 顺序一致）；1 MiB 缓冲把小行合并成大块写
+    with evidence_jsonl_path.open("wb", buffering=1 << 20) as ev_f:
+        for meta, rel in rel_rows:
+            a = _canon(alias_map, str(rel.get("from", "")))
+            b = _canon(alias_map, str(rel.get("to", "")))
+            t = _norm_name(str(rel.get("type", "其他")))
+            status = _norm_name(str(rel.get("status", "不确定")))
+            conf = rel.get("confidence", 0.5)
+            try:
+                conf = float(conf)
+            except Exception:
+                conf = 0.5
+
+            ev = rel.get("evidence") or {}
+            quote = _norm_name(str(ev.get("quote", "")))
+            st = ev.get("start_char")
+            ed = ev.get("end_char")
+
+            key = (a, b, t, status)
+            item = rel_key_map.get(key)
+            if item is None:
+                item = {
+                    "from": a,
+                    "to": b,
+                    "type": t,
+                    "status": status,
+                    "confidence": conf,
+                    "notes": _norm_name(str(rel.get("notes", ""))),
+                    "first_seen_chunk": meta.get("chunk_id"),
+                    "evidence": [],
+                }
+                rel_key_map[key] = item
+            else:
+                item["confidence"] = max(item["confidence"], conf)
+
+            if quote:
+                ev_obj = {
+                    "chunk_id": meta.get("chunk_id"),
+                    "chapter_title": meta.get("chapter_title"),
+                    "quote": quote[:120],
+                    "span": [st, ed],
+                }
+                item["evidence"].append(ev_obj)
+                ev_f.write(_jsonl_line({"key": list(key), **ev_obj}))
 
     relations = []
     for _, item in sorted(rel_key_map.items(), key=lambda x: (x[1]["from"], x[1]["to"], x[1]["type"])):
@@ -209,9 +226,12 @@ def main() -> None:
     }
 
     # write outputs
-    (out_dir / "characters.yml").write_text(yaml.safe_dump(characters, allow_unicode=True, sort_keys=False), encoding="utf-8")
-    (out_dir / "relations.yml").write_text(yaml.safe_dump(relations, allow_unicode=True, sort_keys=False), encoding="utf-8")
-    (out_dir / "graph.json").write_text(json.dumps(graph, ensure_ascii=False, indent=2), encoding="utf-8")
+    (out_dir / "characters.yml").write_text(yaml.dump(characters, Dumper=YAML_DUMPER, allow_unicode=True, sort_keys=False), encoding="utf-8")
+    (out_dir / "relations.yml").write_text(yaml.dump(relations, Dumper=YAML_DUMPER, allow_unicode=True, sort_keys=False), encoding="utf-8")
+    if orjson is not None:
+        (out_dir / "graph.json").write_bytes(orjson.dumps(graph, option=orjson.OPT_INDENT_2))
+    else:
+        (out_dir / "graph.json").write_text(json.dumps(graph, ensure_ascii=False, indent=2), encoding="utf-8")
 
     print(f"[OK] characters -> {out_dir / 'characters.yml'}")
     print(f"[OK] relations   -> {out_dir / 'relations.yml'}")
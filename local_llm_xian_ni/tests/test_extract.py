@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Scheduler invariants of extract.main() that merge.py relies on, with the LLM stubbed out.
+
+  cd local_llm_xian_ni && python -m pytest tests   (or: python -m unittest discover -s tests)
+"""
+
+import asyncio
+import importlib.util
+import json
+import random
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))  # scripts run as `python -m src.xxx` from here
+
+DEPS = all(importlib.util.find_spec(m) is not None for m in ("openai", "httpx", "tqdm"))
+
+if DEPS:
+    from src import extract
+    from src.llm_client import OpenAILLM
+
+
+def _chunks(n: int):
+    rows = []
+    for i in range(n):
+        # every 3rd chunk is the same preface, every 5th the same footer: duplicates spread over the window
+        text = "作者前言" if i % 3 == 0 else "章末附言" if i % 5 == 0 else f"正文{i}"
+        rows.append({"chunk_id": f"{i:06d}", "chapter_index": i // 4 + 1, "chapter_title": f"第{i // 4 + 1}章", "part_index": i % 4 + 1, "text": text})
+    return rows
+
+
+@unittest.skipUnless(DEPS, "needs openai, httpx and tqdm")
+class ExtractSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.rows = _chunks(50)
+        self.chunks = self.tmp / "chunks.jsonl"
+        self.chunks.write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in self.rows), encoding="utf-8")
+        self.out = self.tmp / "extractions.jsonl"
+        self.calls = []
+        self.fail_on = None
+        self.rng = random.Random(7)
+
+    def _run(self, workers: int = 4):
+        test = self
+
+        async def fake_respond_json(self, *, system, user):
+            text = user.split("=== TEXT ===\n", 1)[1]
+            test.calls.append(text)
+            await asyncio.sleep(test.rng.random() / 200)  # finish out of order
+            if text == test.fail_on:
+                raise RuntimeError("boom")
+            return {"entities": [{"name": text}], "relations": []}
+
+        argv = ["extract", "--chunks", str(self.chunks), "--out", str(self.out), "--prompt", str(self.tmp / "none.md"), "--workers", str(workers)]
+        with mock.patch.object(OpenAILLM, "arespond_json", fake_respond_json), mock.patch.object(sys, "argv", argv):
+            extract.main()
+
+    def _written(self):
+        with self.out.open(encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def test_chunk_order_and_one_call_per_text(self):
+        self._run(workers=4)
+        out = self._written()
+        self.assertEqual([o["chunk_id"] for o in out], [r["chunk_id"] for r in self.rows])
+        # dedup fan-out: each row still gets its own meta and the result for its own text
+        for o, r in zip(out, self.rows):
+            self.assertEqual(o["chapter_title"], r["chapter_title"])
+            self.assertEqual(o["extraction"]["entities"][0]["name"], r["text"])
+        self.assertEqual(sorted(self.calls), sorted({r["text"] for r in self.rows}))
+
+    def test_resume_after_partial_write(self):
+        self.fail_on = self.rows[20]["text"]
+        with self.assertRaises(RuntimeError):
+            self._run(workers=3)
+        partial = self._written()
+        # everything before the failing chunk is on disk, in order, nothing after a gap
+        self.assertEqual([o["chunk_id"] for o in partial], [r["chunk_id"] for r in self.rows[: len(partial)]])
+        self.assertLessEqual(len(partial), 20)
+
+        self.fail_on = None
+        self.calls.clear()
+        self._run(workers=3)
+        out = self._written()
+        self.assertEqual([o["chunk_id"] for o in out], [r["chunk_id"] for r in self.rows])
+        self.assertEqual(sorted(self.calls), sorted({r["text"] for r in self.rows[len(partial):]}))
+
+
+def _full_parse_ids(p: Path):
+    # the pre-regex _existing_chunk_ids: every raw line through a full JSON parse
+    s = set()
+    with p.open("rb") as f:
+        for line in f:
+            try:
+                cid = json.loads(line).get("chunk_id")
+                if cid:
+                    s.add(str(cid))
+            except Exception:
+                continue
+    return s
+
+
+@unittest.skipUnless(DEPS, "needs openai, httpx and tqdm")
+class ExistingChunkIdsTest(unittest.TestCase):
+    ROWS = [
+        {"chunk_id": "000001", "extraction": {"entities": [{"name": "林烬"}]}},
+        {"chunk_id": "仙逆-02", "text": "含 } 和 \\n 的正文"},
+        {"chunk_id": 'a"b', "text": "escaped quote"},
+        {"chunk_id": "c\\d", "text": "escaped backslash"},
+        {"chunk_id": 7, "text": "non-string id"},
+        {"chunk_id": "", "text": "empty id"},
+        {"text": "key order", "chunk_id": "000009"},
+    ]
+
+    def setUp(self):
+        self.out = Path(tempfile.mkdtemp()) / "extractions.jsonl"
+
+    def _check(self, data: bytes):
+        self.out.write_bytes(data)
+        self.assertEqual(extract._existing_chunk_ids(self.out), _full_parse_ids(self.out))
+
+    def _lines(self):
+        yield from (extract._jsonl_line(r) for r in self.ROWS)  # what extract.py writes
+        yield from ((json.dumps(r, ensure_ascii=False) + "\n").encode("utf-8") for r in self.ROWS)
+        yield from ((json.dumps(r) + "\r\n").encode("utf-8") for r in self.ROWS)
+
+    def test_same_ids_as_full_parse(self):
+        lines = list(self._lines())
+        data = b"".join(lines) + b"\n   \nnot json\n"
+        self._check(data)
+        self.assertIn('a"b', extract._existing_chunk_ids(self.out))
+
+    def test_truncated_last_line(self):
+        head = b"".join(extract._jsonl_line(r) for r in self.ROWS[:2])
+        for row in (extract._jsonl_line(r) for r in self.ROWS):
+            for cut in range(len(row) + 1):
+                with self.subTest(row=row, cut=cut):
+                    self._check(head + row[:cut])
+
+    def test_half_row_followed_by_next_run(self):
+        # interrupted write, then the resumed run appends the next row to the same line
+        a, b = extract._jsonl_line(self.ROWS[0]), extract._jsonl_line(self.ROWS[1])
+        for cut in range(1, len(a) - 1):
+            with self.subTest(cut=cut):
+                self._check(a[:cut] + b)
+
+
+if __name__ == "__main__":
+    unittest.main()
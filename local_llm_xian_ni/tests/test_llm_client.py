@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+respond_json disk cache: off unless a cache_dir is given; keyed on model + temperature.
+"""
+
+import asyncio
+import importlib.util
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+DEPS = all(importlib.util.find_spec(m) is not None for m in ("openai", "httpx"))
+
+if DEPS:
+    from src.llm_client import LLMConfig, OpenAILLM
+
+
+@unittest.skipUnless(DEPS, "needs openai and httpx")
+class RespondJsonCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+    def _llm(self, cache_dir=None, temperature=0.2):
+        llm = OpenAILLM(LLMConfig(model="m", temperature=temperature), cache_dir=cache_dir)
+
+        def fake_text(*, system, user):
+            self.calls.append(user)
+            return '{"n": %d}' % len(self.calls)
+
+        async def afake_text(*, system, user):
+            return fake_text(system=system, user=user)
+
+        llm.respond_text = fake_text
+        llm.arespond_text = afake_text
+        return llm
+
+    def test_off_by_default(self):
+        llm = self._llm()
+        self.assertEqual(llm.respond_json(system="s", user="u"), {"n": 1})
+        self.assertEqual(llm.respond_json(system="s", user="u"), {"n": 2})
+
+    def test_replays_from_cache_dir(self):
+        d = Path(tempfile.mkdtemp())
+        llm = self._llm(cache_dir=d)
+        self.assertEqual(llm.respond_json(system="s", user="u"), {"n": 1})
+        self.assertEqual(llm.respond_json(system="s", user="u"), {"n": 1})
+        self.assertEqual(asyncio.run(llm.arespond_json(system="s", user="u")), {"n": 1})
+        # another temperature (or model) is another entry
+        self.assertEqual(self._llm(cache_dir=d, temperature=0.9).respond_json(system="s", user="u"), {"n": 2})
+        self.assertEqual(len(self.calls), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import contextlib
+import io
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import types
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from backend.ai.workflows import chapter_worker
+
+
+def _fake_run_one_chapter(ctx, provider, writer, n, max_rewrite, review=False, rewrite_fanout=1):
+    if n == 3:
+        raise RuntimeError("API error")
+    return ctx.project_dir / "chapters" / f"ch{n:02d}.md"
+
+
+class WorkerRoundTripTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.sock = os.path.join(self.tmp, "w.sock")
+        patches = [
+            mock.patch.object(chapter_worker, "load_project_context", lambda p, t, s, k: types.SimpleNamespace(project_dir=p)),
+            mock.patch.object(chapter_worker, "get_ai_provider", lambda: object()),
+            mock.patch.object(chapter_worker, "run_one_chapter", _fake_run_one_chapter),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.server = chapter_worker._Server(self.sock, chapter_worker._JobHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def _submit(self, jobs):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            ok = chapter_worker.submit(self.sock, jobs)
+        return ok, out.getvalue().splitlines()
+
+    def test_all_jobs_answered_in_order(self):
+        jobs = [{"project": "/books/b1", "chapter": n, "style_bible": "sb.json"} for n in (1, 2)]
+        ok, lines = self._submit(jobs)
+        self.assertTrue(ok)
+        self.assertEqual(lines, ["[OK] ch01 -> /books/b1/chapters/ch01.md", "[OK] ch02 -> /books/b1/chapters/ch02.md"])
+
+    def test_bad_jobs_are_reported_and_the_rest_still_run(self):
+        jobs = [
+            {"project": "/books/b1", "chapter": 1, "style_bible": "sb.json"},
+            [1, 2],  # not a job object
+            {"project": "/books/b1", "chapter": 3, "style_bible": "sb.json"},  # chapter raises
+            {"project": "/books/b1", "chapter": 4},  # missing style_bible
+            {"project": "/books/b1", "chapter": 5, "style_bible": "sb.json"},
+        ]
+        ok, lines = self._submit(jobs)
+        self.assertFalse(ok)
+        self.assertEqual(
+            lines,
+            [
+                "[OK] ch01 -> /books/b1/chapters/ch01.md",
+                "[ERR] chNone: ValueError: job must be a JSON object",
+                "[ERR] ch3: RuntimeError: API error",
+                "[ERR] ch4: KeyError: 'style_bible'",
+                "[OK] ch05 -> /books/b1/chapters/ch05.md",
+            ],
+        )
+
+
+class RemoveStaleSocketTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.path = os.path.join(self.tmp, "w.sock")
+
+    def test_dead_socket_is_removed(self):
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        s.bind(self.path)
+        s.close()  # bound but never listening: what a crashed worker leaves behind
+        chapter_worker._remove_stale_socket(self.path)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_live_socket_is_kept(self):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.bind(self.path)
+            s.listen()
+            with self.assertRaises(SystemExit):
+                chapter_worker._remove_stale_socket(self.path)
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_regular_file_is_kept(self):
+        Path(self.path).write_text("not a socket", encoding="utf-8")
+        with self.assertRaises(SystemExit):
+            chapter_worker._remove_stale_socket(self.path)
+        self.assertTrue(os.path.exists(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import unittest
+from pathlib import Path
+
+from backend.ai.agents.guard import GuardAgent, _missing
+
+TEMPLATES = Path(__file__).resolve().parents[1] / "backend" / "ai" / "prompts" / "templates"
+
+GOOD = "# 第1章\n## 摘要\n...\n## 正文\n林烬……\n## 结尾钩子\n...\n## 角色状态\n...\n"
+
+
+class RecordingProvider:
+    def __init__(self):
+        self.calls = []
+
+    def chat(self, messages, temperature=0.7, max_tokens=1200):
+        self.calls.append(messages)
+        return "FAIL: missing sections"
+
+
+class RepairTest(unittest.TestCase):
+    def test_each_rule(self):
+        cases = [
+            ("**摘要**", "## 摘要"),
+            ("摘要：", "## 摘要"),
+            ("##摘要", "## 摘要"),
+            ("正文：", "## 正文"),
+            ("  【正文】", "## 正文"),
+            ("【结尾钩子】", "## 结尾钩子"),
+            ("#结尾钩子：", "## 结尾钩子"),
+            ("**角色状态**:", "## 角色状态"),
+        ]
+        for line, marker in cases:
+            with self.subTest(line=line):
+                draft = GOOD.replace(marker + "\n", line + "\n")
+                self.assertIn(marker, _missing(draft))
+                self.assertEqual(GuardAgent.repair(draft), GOOD)
+
+    def test_only_the_first_variant_is_rewritten(self):
+        draft = GOOD.replace("## 摘要\n", "**摘要**\n") + "**摘要**\n"
+        self.assertEqual(GuardAgent.repair(draft), GOOD + "**摘要**\n")
+
+    def test_heading_inside_prose_is_not_a_header(self):
+        draft = GOOD.replace("## 正文\n", "") + "正文里提到的摘要两字\n"
+        repaired = GuardAgent.repair(draft)
+        self.assertEqual(repaired, draft)
+        self.assertEqual(_missing(repaired), ["## 正文"])
+
+
+class CheckAndRepairTest(unittest.TestCase):
+    def test_repaired_draft_skips_the_llm(self):
+        provider = RecordingProvider()
+        guard = GuardAgent(provider, TEMPLATES)
+        verdict, draft = guard.check_and_repair("spec", GOOD.replace("## 正文\n", "正文：\n"))
+        self.assertEqual((verdict, draft), ("PASS", GOOD))
+        self.assertEqual(provider.calls, [])
+
+    def test_genuinely_missing_heading_goes_to_the_llm(self):
+        provider = RecordingProvider()
+        guard = GuardAgent(provider, TEMPLATES)
+        draft = GOOD.replace("## 角色状态\n...\n", "")
+        verdict, out = guard.check_and_repair("spec", draft)
+        self.assertEqual(out, draft)
+        self.assertEqual(verdict, "FAIL: missing sections")
+        self.assertEqual(len(provider.calls), 1)
+        self.assertIn("## 角色状态", provider.calls[0][1]["content"])
+
+
+if __name__ == "__main__":
+    unittest.main()
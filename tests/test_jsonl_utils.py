@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from backend.ai.knowledge._jsonl_utils import (
+    force_pacing_profile_mapping,
+    parse_if_clean,
+    parse_yaml_or_raise,
+    postprocess_yaml,
+)
+
+
+# (name, model output, fast path expected to take it)
+PARSE_CASES = [
+    ("clean", "name: 模板\npacing_profile:\n  overall_rhythm: 快\n  conflict_density: 高\nchapters:\n  - 开端\n  - 高潮\n", True),
+    ("fenced", "```yaml\nname: x\npacing_profile:\n  overall_rhythm: 快\n```", True),
+    ("no pacing_profile", "name: x\nitems:\n  - a\n", True),
+    ("inline mapping", "name: x\npacing_profile: {overall_rhythm: 快, hook_frequency: 每章}\n", True),
+    ("pacing list", "name: x\npacing_profile:\n  - overall_structure: 快\n  - conflict_density: 高\n", False),
+    ("nested pacing_profile", "name: x\npacing_profile:\n  overall_rhythm:\n    early: 慢\n    late: 快\n", False),
+    ("duplicate pacing_profile", "name: x\npacing_profile:\n  overall_rhythm: 快\nother:\n  pacing_profile:\n    hook_frequency: 每章\n", False),
+    ("empty pacing_profile", "name: x\npacing_profile:\nnext: 1\n", False),
+    ("fullwidth colon", "name： x\n", False),
+    ("dash without space", "items:\n  -a\n", False),
+    ("tab indent", "items:\n\t- a\n", False),
+    ("percent key", "acts:\n  - typical_length_percent: 10-15\n", False),
+]
+
+
+class ParseIfCleanTest(unittest.TestCase):
+    def test_fast_path_matches_slow_path(self):
+        for name, text, fast in PARSE_CASES:
+            with self.subTest(name):
+                got = parse_if_clean(text)
+                if not fast:
+                    self.assertIsNone(got)
+                    continue
+                self.assertIsNotNone(got)
+                self.assertEqual(got, parse_yaml_or_raise(postprocess_yaml(text)))
+
+
+# outputs recorded from the original line-by-line _force_pacing_profile_mapping
+PACING_LIST_IN = (
+    "name: 模板\n"
+    "pacing_profile:\n"
+    "  - overall_structure: 先抑后扬\n"
+    "  -conflict_density：高\n"
+    "  - 节奏快慢结合：张弛有度\n"
+    "  - 信息揭露节奏: 层层剥开\n"
+    "chapters:\n"
+    "  - 开端\n"
+)
+PACING_LIST_OUT = (
+    "name: 模板\n"
+    "pacing_profile:\n"
+    "  overall_rhythm: 先抑后扬\n"
+    "  conflict_density: 中高（每章至少1-2段冲突/危机）\n"
+    "  hook_frequency: 章末必有钩子，部分章节中段可有小钩子\n"
+    "  reveal_rhythm: 层层剥开\n"
+    "  tempo_adjustment: conflict_density：高\n"
+    "  notes:\n"
+    "    - tempo_adjustment: 节奏快慢结合：张弛有度\n"
+    "chapters:\n"
+    "  - 开端\n"
+)
+PACING_DUPS_IN = (
+    "pacing_profile:\n"
+    "  - hook_frequency: 每章\n"
+    "  - hook_frequency: 中段也有\n"
+    "  - 一句没有冒号的话\n"
+    "  - extra_key: 保留\n"
+)
+PACING_DUPS_OUT = (
+    "pacing_profile:\n"
+    "  overall_rhythm: 起伏分明：先铺垫→冲突加速→信息揭露→阶段收束→章末钩子\n"
+    "  conflict_density: 中高（每章至少1-2段冲突/危机）\n"
+    "  hook_frequency: 每章\n"
+    "  reveal_rhythm: 递进式揭露：碎片线索→局部真相→反转/伏笔回收\n"
+    "  tempo_adjustment: 一句没有冒号的话\n"
+    "  extra_key: 保留\n"
+    "  notes:\n"
+    "    - hook_frequency: 中段也有\n"
+)
+
+
+class PacingProfileTest(unittest.TestCase):
+    def test_list_becomes_mapping(self):
+        self.assertEqual(postprocess_yaml(PACING_LIST_IN), PACING_LIST_OUT)
+
+    def test_duplicates_go_to_notes_and_extra_keys_are_kept(self):
+        self.assertEqual(postprocess_yaml(PACING_DUPS_IN), PACING_DUPS_OUT)
+
+    def test_header_with_comment_is_left_alone(self):
+        text = "name: x\npacing_profile:  # 节奏\n  - overall_structure: 快\n"
+        self.assertEqual(postprocess_yaml(text), text)
+
+    def test_inline_and_mapping_blocks_are_left_alone(self):
+        for text in (
+            "name: x\npacing_profile: {overall_rhythm: 快}\n",
+            "name: x\npacing_profile:\n  overall_rhythm: 快\n\n  hook_frequency: 每章\nnext: 1\n",
+        ):
+            with self.subTest(text=text):
+                self.assertEqual(force_pacing_profile_mapping(text), text)
+                self.assertEqual(postprocess_yaml(text), text)
+
+    def test_indented_header_is_rewritten_at_top_level(self):
+        # historical quirk: the rewritten header loses its indentation
+        text = "acts:\n  pacing_profile:\n  - overall_structure: 快\nend: 1\n"
+        out = postprocess_yaml(text)
+        self.assertTrue(out.startswith("acts:\npacing_profile:\n  overall_rhythm: 快\n"))
+        self.assertTrue(out.endswith("\nend: 1\n"))
+
+    def test_project_spec_outline_without_pacing_list(self):
+        # generate_project_spec_outline goes through the full postprocess_yaml too; for its
+        # usual output only the dash / fullwidth-colon / tab fixes apply
+        text = "```yaml\nspec:\n\ttitle： 逆仙\n  tags:\n    -修真\n```"
+        self.assertEqual(postprocess_yaml(text), "spec:\n  title: 逆仙\n  tags:\n    - 修真\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
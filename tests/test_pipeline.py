@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from backend.ai.agents.pipeline import ChapterPipeline
+
+TEMPLATES = Path(__file__).resolve().parents[1] / "backend" / "ai" / "prompts" / "templates"
+
+DRAFT = "# 第1章\n## 摘要\n...\n## 正文\n林烬……\n## 结尾钩子\n...\n## 角色状态\n...\n"
+
+
+class RecordingProvider:
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def chat(self, messages, temperature=0.7, max_tokens=1200):
+        with self._lock:
+            self.calls.append(messages)
+        if messages[0]["content"].startswith("You are a bestselling novelist"):
+            return DRAFT
+        return "OK"
+
+
+class ChapterPipelineTest(unittest.TestCase):
+    def test_writer_gets_the_rendered_prompt(self):
+        provider = RecordingProvider()
+        with tempfile.TemporaryDirectory() as d:
+            pipe = ChapterPipeline(provider, TEMPLATES, style_bible_path=Path(d) / "style_bible.json")
+            spec = {"title": "逆仙", "protagonist": "林烬"}
+            chapter = {"id": 1, "title": "灰烬", "beats": ["雨夜入城", "旧敌现身"], "hook": "玉简碎裂"}
+            out = pipe.run(spec, chapter, knowledge="玄天宗", memory="林烬重伤未愈")
+
+        writer_calls = [m for m in provider.calls if m[0]["content"].startswith("You are a bestselling novelist")]
+        self.assertEqual(len(writer_calls), 1)
+        user = writer_calls[0][1]["content"]
+        self.assertEqual(user, out["prompt"])
+        for text in ("逆仙", "第1章 - 灰烬", "1. 雨夜入城", "2. 旧敌现身", "结尾钩子：玉简碎裂", "玄天宗", "林烬重伤未愈"):
+            self.assertIn(text, user)
+        for slot in ("{spec}", "{chapter_outline}", "{memory}", "{knowledge}", "{style_bible}"):
+            self.assertNotIn(slot, user)
+        self.assertEqual(out["draft"], DRAFT)
+        self.assertEqual(out["guard"], "PASS")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from backend.ai.workflows import run_chapter
+
+
+class CompiledTextTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.src = self.tmp / "book" / "spec.yml"
+        self.src.parent.mkdir()
+        self.src.write_text("title: 逆仙\n", encoding="utf-8")
+        env = mock.patch.dict(os.environ, {"WRITEBOOK_SIDECAR_DIR": str(self.tmp / "sidecars")})
+        env.start()
+        self.addCleanup(env.stop)
+        self.addCleanup(self._tmp.cleanup)
+        self.cache_dir = run_chapter._sidecar_dir(self.src.parent)
+
+    def test_sidecars_live_outside_the_project(self):
+        run_chapter._compiled_text(self.cache_dir, "spec.compiled.txt", self.src, lambda: "dump")
+        self.assertEqual([p.name for p in self.src.parent.iterdir()], ["spec.yml"])
+        self.assertTrue((self.cache_dir / "spec.compiled.txt").exists())
+
+    def test_reuses_sidecar_until_source_changes(self):
+        calls = []
+
+        def build():
+            calls.append(1)
+            return f"dump {len(calls)}"
+
+        first = run_chapter._compiled_text(self.cache_dir, "spec.compiled.txt", self.src, build)
+        again = run_chapter._compiled_text(self.cache_dir, "spec.compiled.txt", self.src, build)
+        self.assertEqual((first, again, len(calls)), ("dump 1", "dump 1", 1))
+
+        self.src.write_text("title: 逆仙传\n", encoding="utf-8")
+        self.assertEqual(run_chapter._compiled_text(self.cache_dir, "spec.compiled.txt", self.src, build), "dump 2")
+
+    def test_sidecar_from_another_format_is_rebuilt(self):
+        st = self.src.stat()
+        side = self.cache_dir / "spec.compiled.txt"
+        side.parent.mkdir(parents=True)
+        side.write_text(f"{st.st_mtime_ns} {st.st_size}\nold layout", encoding="utf-8")
+        text = run_chapter._compiled_text(self.cache_dir, "spec.compiled.txt", self.src, lambda: "new layout")
+        self.assertEqual(text, "new layout")
+        self.assertTrue(side.read_text(encoding="utf-8").startswith(f"v{run_chapter._SIDECAR_FORMAT} "))
+
+
+class FirstOkTest(unittest.TestCase):
+    def test_losers_are_told_to_stop(self):
+        aborted = []
+        done = threading.Event()
+
+        def draft(t, stop):
+            if t == 0.6:
+                return "good"
+            # a slow leg: polls stop between "deltas" like _draft_until does
+            for _ in range(200):
+                if stop.is_set():
+                    aborted.append(t)
+                    if len(aborted) == 2:
+                        done.set()
+                    return ""
+                time.sleep(0.01)
+            return "slow"
+
+        text = run_chapter._first_ok(draft, [0.6, 0.75, 0.9], lambda s: s == "good")
+        self.assertEqual(text, "good")
+        self.assertTrue(done.wait(1.0))
+        self.assertEqual(sorted(aborted), [0.75, 0.9])
+
+    def test_last_result_when_none_passes(self):
+        text = run_chapter._first_ok(lambda t, stop: f"bad {t}", [0.6], lambda s: False)
+        self.assertEqual(text, "bad 0.6")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import types
+import unittest
+from unittest import mock
+
+from backend.ai.workflows import run_chapters
+
+
+def _fake_generate(ctx, writer, n, max_rewrite, stream=False, rewrite_fanout=1):
+    if n == 3:
+        raise RuntimeError("API error")
+    return types.SimpleNamespace(number=n, title=f"第{n}章"), f"outline {n}", f"text {n}"
+
+
+class RunParallelTest(unittest.TestCase):
+    def test_one_failing_chapter_does_not_discard_the_others(self):
+        saved, finished = [], []
+        with mock.patch.object(run_chapters, "generate_chapter", _fake_generate), \
+                mock.patch.object(run_chapters, "save_chapter", lambda ctx, ch, text: saved.append((ch.number, text))), \
+                mock.patch.object(run_chapters, "finish_chapter", lambda ctx, p, n, o, t, r: finished.append(n)):
+            failed = run_chapters.run_parallel(None, None, None, [1, 2, 3, 4, 5], max_concurrency=2)
+        self.assertEqual(failed, [3])
+        self.assertEqual(sorted(saved), [(1, "text 1"), (2, "text 2"), (4, "text 4"), (5, "text 5")])
+        self.assertEqual(sorted(finished), [1, 2, 4, 5])
+
+    def test_memory_failure_is_reported(self):
+        def finish(ctx, p, n, o, t, r):
+            if n == 2:
+                raise ValueError("bad memory json")
+        with mock.patch.object(run_chapters, "generate_chapter", _fake_generate), \
+                mock.patch.object(run_chapters, "save_chapter", lambda ctx, ch, text: None), \
+                mock.patch.object(run_chapters, "finish_chapter", finish):
+            self.assertEqual(run_chapters.run_parallel(None, None, None, [1, 2, 3]), [2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
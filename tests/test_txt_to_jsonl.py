@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+python -m pytest tests   (or: python -m unittest discover -s tests)
+"""
+
+import unittest
+
+from backend.ai.ingest.txt_to_jsonl import cn_to_int, detect_chapter
+
+
+class CnToIntTest(unittest.TestCase):
+    def test_ascii_digits(self):
+        for s, want in [("12", 12), ("007", 7), ("0", 0), (" 35 ", 35)]:
+            self.assertEqual(cn_to_int(s), want, s)
+
+    def test_digit_sequences_read_positionally(self):
+        # 一二 is "12", not 1: digit-only numerals are read digit by digit
+        for s, want in [("三", 3), ("两", 2), ("零", 0), ("一二", 12), ("一二三", 123), ("二零二四", 2024)]:
+            self.assertEqual(cn_to_int(s), want, s)
+
+    def test_unit_forms(self):
+        cases = [
+            ("十", 10),
+            ("十二", 12),
+            ("二十", 20),
+            ("二十三", 23),
+            ("一百", 100),
+            ("两百", 200),
+            ("一百零五", 105),
+            ("一百一十", 110),
+            ("一百二十三", 123),
+            ("三千", 3000),
+            ("一千零一", 1001),
+            ("两千三百四十五", 2345),
+            ("九千九百九十九", 9999),
+        ]
+        for s, want in cases:
+            self.assertEqual(cn_to_int(s), want, s)
+
+    def test_unknown_chars(self):
+        self.assertEqual(cn_to_int(""), 0)
+        self.assertEqual(cn_to_int("x"), 0)
+
+    def test_detect_chapter(self):
+        self.assertEqual(detect_chapter("第十二章 出山"), (True, 12))
+        self.assertEqual(detect_chapter("第二十三章"), (True, 23))
+        self.assertEqual(detect_chapter("CHAPTER 7"), (True, 7))
+        self.assertFalse(detect_chapter("他说第三次了")[0])
+
+
+if __name__ == "__main__":
+    unittest.main()